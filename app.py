@@ -35,15 +35,32 @@ def calculate_integrity_score(
         risk = "High Risk"
     return score, risk
 from flask import Flask, render_template, Response, jsonify, request, redirect, url_for, session, flash
-from src.utils.db import add_user_with_embedding, get_face_embedding
+from src.utils.db import add_user_with_embedding
+from src.utils.embedding_cache import EmbeddingCache
+from src.utils.embedding_index import EmbeddingIndex
+from src.utils.model_registry import registry as model_registry, get_yolo
+from src.utils.memory_report import process_memory
+from src.utils.warmup import ModelWarmup
+from src.utils.ttl_value import TTLValue
 from src.auth.face_auth import FaceAuthenticator
 from src.monitoring.behavior_monitor import BehaviorMonitor
-from src.utils.camera import Camera
+from src.utils.camera import Camera, RemoteCamera
+from src.utils.mjpeg_hub import MJPEGHub
+from src.monitoring.inference_pool import InferencePool, LocalInference
+from src.monitoring.profiles import ProfileManager, profile_settings, face_auth_for
+from src.monitoring.load_controller import LoadController
+from src.monitoring.risk_scheduler import RiskScheduler
+from src.monitoring.yolo_onnx import default_phone_model
+from accuracy_config import ACCURACY_LEVELS, CURRENT_ACCURACY_LEVEL
+from performance_config import CAMERA_SETTINGS, MOTION_GATE_SETTINGS, QUALITY_GATE, QUALITY_ESCALATE_AFTER
+from src.utils.motion_gate import MotionGate
+from src.utils.frame_context import FrameContext
+from src.utils.image_utils import frame_quality, quality_problem
+from concurrent.futures import Future
+import struct
 import cv2
 import threading
-import queue
 import time
-import sounddevice as sd
 import numpy as np
 import sqlite3
 import os
@@ -101,6 +118,11 @@ def ensure_exams_table():
         course_code TEXT,
         exam_title TEXT
     )''')
+    # Accuracy/performance profile used while proctoring this exam (accuracy_config)
+    c.execute("PRAGMA table_info(exams)")
+    columns = [col[1] for col in c.fetchall()]
+    if 'accuracy_profile' not in columns:
+        c.execute('ALTER TABLE exams ADD COLUMN accuracy_profile TEXT')
     conn.commit()
     conn.close()
 
@@ -190,6 +212,7 @@ def init_db():
     # Insert default thresholds
     default_thresholds = {
         'face_mismatch': 1,
+        'camera_obstructed': 1,
         'multiple_faces': 2,
         'looking_away': 4,
         'audio': 2,
@@ -209,18 +232,110 @@ init_db()
 
 
 
-# Global objects: load all heavy models ONCE at startup
+# Global objects: heavy models load ONCE, in the background (see warmup below)
 camera = None
-face_auth = FaceAuthenticator()  # Load face model once
-try:
-    from src.monitoring.behavior_monitor import BehaviorMonitor
-    behavior_monitor = BehaviorMonitor(None)  # Load behavior model once
-except Exception as e:
-    import traceback
-    print('Error initializing BehaviorMonitor at startup:', traceback.format_exc())
-frame_queue = queue.Queue(maxsize=10)
+# Every enrolled face, for spotting one person registering under several usernames
+embedding_index = EmbeddingIndex.from_db()
+DUPLICATE_FACE_SIMILARITY = 0.6  # same cut-off verify_face uses (tolerance 0.4); flags, never refuses
+# Decoded, unit-norm registered templates so verification skips the DB round-trip
+embedding_cache = EmbeddingCache(max_size=1024, ttl_seconds=300)
+# Number of separate inference processes for proctoring checks; 0 keeps
+# inference inside this process (one check at a time)
+INFERENCE_WORKERS = int(os.environ.get("EXAMGUARD_INFERENCE_WORKERS", 0))
+# Models are built and exercised once on a background thread so the app starts
+# serving immediately; /readyz reports when they can take traffic
+warmup = ModelWarmup()
+warmup.add('face_auth', FaceAuthenticator, FaceAuthenticator.warm_up)
+if INFERENCE_WORKERS > 0:
+    # Workers load their own behaviour models; none are needed here
+    warmup.add('inference', lambda: InferencePool(INFERENCE_WORKERS).start().wait_ready())
+else:
+    # Without behaviour models, face verification still runs
+    warmup.add('behavior_monitor', lambda: BehaviorMonitor(None), BehaviorMonitor.warm_up, required=False)
+    # Periodic identity checks use the exam's accuracy profile and share
+    # ONNX Runtime batches across sessions
+    warmup.add('profiles', ProfileManager, ProfileManager.warm_up)
+    # Fails (and /readyz stays 503) if the profiles failed, rather than breaking the first verify
+    warmup.add('inference', lambda: LocalInference(warmup.require('profiles'), warmup.get('behavior_monitor')))
+# Login and registration wait this long for the face model before giving up
+FACE_MODEL_WAIT = 30
+FACE_MODEL_NOT_READY = "Face recognition is still starting up. Please try again in a moment."
+
+@app.route('/readyz')
+@limiter.exempt
+def readyz():
+    """Readiness probe: 200 once every required model is loaded and warmed up"""
+    ready = warmup.is_ready()
+    return jsonify({'ready': ready, 'models': warmup.status()}), 200 if ready else 503
+# Per-session preview streams: each processed frame is JPEG-encoded once and the
+# same bytes go to every viewer. Only the newest frames are kept per session.
+PREVIEW_SETTINGS = {
+    'jpeg_quality': int(os.environ.get("EXAMGUARD_PREVIEW_QUALITY", 70)),
+    'max_fps': float(os.environ.get("EXAMGUARD_PREVIEW_MAX_FPS", 10)),
+    'channel_size': 2,
+}
+# Samples CPU/memory and check latency, and sheds proctoring load under pressure
+load_controller = LoadController()
+# Shares the node's check budget between students according to recent violations
+risk_scheduler = RiskScheduler()
+
+# serve.py sets this: model weights are loaded in the parent before forking, and
+# threads (which do not survive fork) are started in each worker afterwards
+PRELOAD = os.environ.get("EXAMGUARD_PRELOAD") == "1"
+
+def preload_models():
+    """
+    Load model weights into the shared registry without starting any threads, so
+    forked workers share them copy-on-write. MediaPipe graphs run their own
+    threads and are created per session after the fork.
+    """
+    # Single-threaded ONNX Runtime sessions have no thread pool to lose in the fork;
+    # parallelism comes from the worker processes
+    model_registry.session_threads = 1
+    FaceAuthenticator()
+    if INFERENCE_WORKERS == 0:
+        face_auth_for(CURRENT_ACCURACY_LEVEL)
+        try:
+            get_yolo(default_phone_model())
+        except Exception as e:
+            # BehaviorMonitor runs without the phone detector in this case
+            logging.warning(f"YOLO phone detector not preloaded: {e}")
+
+def start_background_services():
+    """Start warm-up and load monitoring; in a pre-forked server, call after forking"""
+    warmup.start()
+    load_controller.start()
+
+if not PRELOAD:
+    start_background_services()
+
+frame_hub = MJPEGHub(
+    quality=PREVIEW_SETTINGS['jpeg_quality'],
+    max_fps=PREVIEW_SETTINGS['max_fps'],
+    channel_size=PREVIEW_SETTINGS['channel_size']
+)
 audio_alert = False
-registered_face_embedding = None
+
+# Where proctoring frames come from: 'remote' (uploaded by each student's browser)
+# or 'local' (the server's own webcam, single seat, useful for development)
+CAMERA_SOURCE = os.environ.get("EXAMGUARD_CAMERA_SOURCE", "remote")
+# Upper bounds the server accepts when negotiating a client's capture settings
+INGEST_SETTINGS = {
+    'width': 320,
+    'height': 240,
+    'fps': 10,
+    'jpeg_quality': 0.7,
+    'max_frame_bytes': 512 * 1024,
+    # Smallest size and rate a client may negotiate (the preview is 160 wide)
+    'min_width': 160,
+    'min_height': 120,
+    'min_fps': 1,
+}
+SESSION_CAMERAS = {}  # {username: RemoteCamera}
+# When > 0, cameras also write frames into a shared-memory ring of this many
+# slots so separate analysis processes can read them without pickling
+SHARED_RING_SLOTS = int(os.environ.get("EXAMGUARD_SHARED_RING_SLOTS", 0))
+SESSION_EMBEDDINGS = {}  # {username: unit-norm registered face template}
 
 # --- Per-student metrics for integrity score ---
 METRICS = {}  # {username: {face_visible_time, multiple_faces_detected, noise_level, tab_switch_count, phone_detected, suspicious_object_detected}}
@@ -246,7 +361,39 @@ def save_thresholds(thresholds):
     conn.commit()
     conn.close()
 
-INTEGRITY_THRESHOLDS = load_thresholds()
+# Read through a short TTL: under serve.py each web worker has its own memory,
+# so an admin's change on one worker reaches students on the others within seconds
+SETTINGS_TTL = 5.0
+INTEGRITY_THRESHOLDS = TTLValue(load_thresholds, SETTINGS_TTL)
+
+# --- Accuracy profile per exam ---
+def load_exam_profiles():
+    conn = get_db()
+    rows = conn.execute('SELECT id, accuracy_profile FROM exams').fetchall()
+    conn.close()
+    return {row[0]: row[1] for row in rows if row[1] in ACCURACY_LEVELS}
+
+EXAM_PROFILES = TTLValue(load_exam_profiles, SETTINGS_TTL)  # {exam_id: accuracy level}
+SESSION_EXAMS = {}  # {username: exam_id being proctored}
+MOTION_GATES = {}  # {username: MotionGate of their proctoring loop}
+PREVIEW_WIDTH = 160  # Proctoring preview and alert screenshots (160x120 for 4:3 cameras)
+STALE_CHECK_INTERVALS = 5  # A check still unanswered after this many check intervals is given up
+
+def session_profile(user):
+    """Accuracy level for this student's exam, or the configured default"""
+    return EXAM_PROFILES.get().get(SESSION_EXAMS.get(user), CURRENT_ACCURACY_LEVEL)
+
+def parse_exam_id(value):
+    """exam_id from a form, query string, session or JSON body as an int; None if it is not one"""
+    value = str(value) if value is not None else ''
+    return int(value) if value.isdigit() else None
+
+def newest_exam_id():
+    """The exam students are proctored for when they do not name one"""
+    conn = get_db()
+    row = conn.execute('SELECT MAX(id) FROM exams').fetchone()
+    conn.close()
+    return row[0] if row else None
 VIOLATION_COUNTS = {}
 
 def increment_violation(user, alert_type):
@@ -257,7 +404,9 @@ def increment_violation(user, alert_type):
     if alert_type not in VIOLATION_COUNTS[user]:
         VIOLATION_COUNTS[user][alert_type] = 0
     VIOLATION_COUNTS[user][alert_type] += 1
-    threshold = INTEGRITY_THRESHOLDS.get(alert_type, 1)
+    # Check this student more often for a while
+    risk_scheduler.record_event(user, alert_type)
+    threshold = INTEGRITY_THRESHOLDS.get().get(alert_type, 1)
     return VIOLATION_COUNTS[user][alert_type] >= threshold
 
 def reset_violations(user=None):
@@ -268,41 +417,111 @@ def reset_violations(user=None):
         VIOLATION_COUNTS = {}
 
 
+def get_session_camera(user):
+    """Return the frame source proctoring should read for this user"""
+    if CAMERA_SOURCE == 'local':
+        return camera
+    return SESSION_CAMERAS.get(user)
+
 # Only update embedding and camera, do not reload models
-def initialize_system(registered_embedding=None):
-    global camera, registered_face_embedding, behavior_monitor
+def initialize_system(registered_embedding=None, user=None):
+    global camera
     try:
-        if camera is None:
-            camera = Camera()
-        # Fast camera warm-up: try to get a valid frame up to 3 times, fail fast
-        frame = None
-        for _ in range(3):
-            frame = camera.get_frame()
-            if frame is not None:
-                break
-            time.sleep(0.05)
-        if frame is None:
-            # Camera could not be accessed or no frames available
-            return jsonify({"status": "error", "message": "Camera access denied or not available. Please check your webcam connection and permissions."}), 500
-        # Set embedding for this session (do NOT reload models)
+        if CAMERA_SOURCE != 'local':
+            # Frames arrive through /ingest_frame once the exam page loads
+            if user not in SESSION_CAMERAS:
+                source = RemoteCamera(
+                    width=INGEST_SETTINGS['width'],
+                    height=INGEST_SETTINGS['height'],
+                    fps=INGEST_SETTINGS['fps']
+                )
+                if SHARED_RING_SLOTS:
+                    source.enable_shared_ring(
+                        (INGEST_SETTINGS['height'], INGEST_SETTINGS['width'], 3),
+                        slots=SHARED_RING_SLOTS
+                    )
+                SESSION_CAMERAS[user] = source
+        elif camera is None:
+            camera = Camera(
+                width=CAMERA_SETTINGS['width'],
+                height=CAMERA_SETTINGS['height'],
+                fps=CAMERA_SETTINGS['fps'],
+                shared_ring_slots=SHARED_RING_SLOTS
+            )
+        if CAMERA_SOURCE == 'local':
+            # Fast camera warm-up: try to get a valid frame up to 3 times, fail fast
+            frame = None
+            for _ in range(3):
+                frame = camera.get_frame()
+                if frame is not None:
+                    break
+                time.sleep(0.05)
+            if frame is None:
+                # Camera could not be accessed or no frames available
+                return jsonify({"status": "error", "message": "Camera access denied or not available. Please check your webcam connection and permissions."}), 500
+        # Set embedding for this session (do NOT reload models); process_frame
+        # opens the inference session once the models are ready
         if registered_embedding is not None:
-            registered_face_embedding = registered_embedding
-            # Update embedding in behavior_monitor if method exists
-            if hasattr(behavior_monitor, 'set_registered_embedding'):
-                behavior_monitor.set_registered_embedding(registered_embedding)
-            elif hasattr(behavior_monitor, 'registered_embedding'):
-                behavior_monitor.registered_embedding = registered_embedding
+            SESSION_EMBEDDINGS[user] = registered_embedding
     except Exception as e:
         import traceback
         print('Error in initialize_system:', traceback.format_exc())
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def inference_result(future, what):
+    """Result of a finished inference future, or None if the call failed"""
+    if future is None:
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        logging.error(f"Inference {what} failed: {e}")
+        return None
+
+def track_lag(future, stage, submitted):
+    """Report how long a submitted check took to the load controller"""
+    future.add_done_callback(lambda f: load_controller.record_lag(stage, time.time() - submitted))
+
+def submit_checks(inference, user, context, profile, settings, now, verify=True):
+    """Submit one frame's verify and analyze checks on its FrameContext; returns the pending tuple"""
+    registered_embedding = SESSION_EMBEDDINGS.get(user)
+    verify_future = None
+    if verify and registered_embedding is not None:
+        verify_future = inference.submit_verify(user, context, registered_embedding,
+                                                stored_normalized=True, profile=profile)
+        track_lag(verify_future, 'verify', now)
+    analyze_future = inference.submit_analyze(user, context, run_pose=settings['run_pose'],
+                                              run_yolo=settings['run_yolo'])
+    track_lag(analyze_future, 'analyze', now)
+    return (context.bgr(PREVIEW_WIDTH), verify_future, analyze_future)
+
+def record_quality_event(user, problem):
+    """A frame too poor to verify: counted per reason; only a long run of them is a violation"""
+    if user in METRICS:
+        events = METRICS[user].setdefault('quality_events', {})
+        events[problem] = events.get(problem, 0) + 1
+    logging.debug(f"Skipped verification for {user}: frame {problem}")
+
+def completed(value):
+    """A future that already holds value"""
+    future = Future()
+    future.set_result(value)
+    return future
+
 def process_frame(user=None, role=None):
-    global registered_face_embedding
     frame_count = 0
+    last_seq = 0
+    last_source = None
     last_check = 0
-    check_interval = 2.0  # Increased: seconds between heavy checks
-    heavy_check_every_n_frames = 10  # Increased: Only run heavy checks every 10 frames
+    pending = None  # (frame, verify future, analyze future) of the check in flight
+    pending_since = 0
+    replayed = False  # pending holds last_results again rather than a new analysis
+    inference = None
+    # Heavy checks only run when the scene changed (or keep_alive expired)
+    gate = MotionGate(**MOTION_GATE_SETTINGS)
+    MOTION_GATES[user] = gate
+    risk_scheduler.open(user)
+    last_results = None  # (verify result, behaviour results) of the last real check
     # --- METRICS INIT ---
     if user and user not in METRICS:
         METRICS[user] = {
@@ -313,46 +532,119 @@ def process_frame(user=None, role=None):
             'phone_detected': False,
             'suspicious_object_detected': False,
             'noise_samples': [],
+            'quality_events': {},
         }
+    poor_quality_since = None  # Start of the current run of frames too poor to verify
     while True:
         # Only run proctoring if global flag is set for this user
         if not PROCTORING_ACTIVE.get(user, False):
             time.sleep(0.1)
             continue
-        if camera:
+        source = get_session_camera(user)
+        if source:
             # Only run proctoring for students
             if role == 'admin':
                 time.sleep(0.05)
                 continue
-            frame = camera.get_frame()
+            if source is not last_source:
+                last_source, last_seq = source, 0
+            # Wakes up as soon as a new frame lands; never sees the same frame twice
+            seq, frame = source.wait_for_frame(last_seq, timeout=0.5)
             if frame is not None:
-                # --- Optimization: Lower resolution for proctoring ---
-                frame = cv2.resize(frame, (160, 120))  # Lowered from 320x240 for speed
+                last_seq = seq
+                # Every size and colour space of this frame is derived once, on demand:
+                # the gate, preview, verification and behaviour checks share the copies
+                context = FrameContext(frame)
+                # Pool workers then map the frame from the shared ring instead of receiving it
+                context.ring_ref = source.ring_ref(seq, frame)
+                # --- Optimization: Lower resolution for the preview and alert images ---
+                frame = context.bgr(PREVIEW_WIDTH)
                 frame_count += 1
                 now = time.time()
+                # The exam's accuracy profile sets the check cadence; re-read so an
+                # admin switching profiles takes effect mid-exam
+                profile = session_profile(user)
+                # Under CPU/memory pressure the load controller spaces checks out
+                # and sheds YOLO, then pose; face verification always runs
+                settings = load_controller.adjust(profile_settings(profile))
+                # Students with recent violations get a larger share of the node's checks
+                settings = risk_scheduler.adjust(user, settings)
+                check_interval = settings['check_interval']
+                heavy_check_every_n_frames = settings['heavy_check_every_n_frames']
                 # --- METRICS: Count total frames ---
                 if user in METRICS:
                     METRICS[user]['total_frames'] += 1
+                gate.update(context)
                 # --- Only run heavy checks every N frames and every check_interval seconds ---
-                if frame_count % heavy_check_every_n_frames == 0 and (now - last_check > check_interval):
+                # Checks are submitted without blocking; the preview keeps flowing meanwhile
+                if inference is None:
+                    # Until warm-up finishes only the preview runs
+                    inference = warmup.get('inference', timeout=0)
+                    if inference is not None:
+                        # Each student gets their own behaviour trackers on the inference side.
+                        # Identity is checked by the batched verify below, so the behaviour
+                        # monitor is not given the template and skips its own check
+                        inference.open_session(user, None)
+                if inference is not None and pending is None and frame_count % heavy_check_every_n_frames == 0 and (now - last_check > check_interval):
                     last_check = now
+                    replayed = last_results is not None and not gate.should_analyze(now)
+                    if replayed:
+                        # Static scene: show the previous results again instead of re-running.
+                        # They were already counted, so they raise no new violations
+                        pending = (frame, completed(last_results[0]), completed(last_results[1]))
+                    else:
+                        # Blurred, dark or blown-out frames only yield 'no face' and false
+                        # mismatches, so they skip verification; behaviour analysis still runs
+                        verify = True
+                        problem = quality_problem(frame_quality(context.gray(PREVIEW_WIDTH)), **QUALITY_GATE)
+                        if problem is None:
+                            poor_quality_since = None
+                        else:
+                            record_quality_event(user, problem)
+                            if poor_quality_since is None:
+                                poor_quality_since = now
+                            if now - poor_quality_since < QUALITY_ESCALATE_AFTER:
+                                verify = False
+                            else:
+                                # Too long without a usable frame (covered camera, lights off):
+                                # flag it, and verify anyway so a missing face counts as before
+                                poor_quality_since = now
+                                if increment_violation(user or 'unknown', 'camera_obstructed'):
+                                    add_alert(user or 'unknown', 'camera_obstructed', frame=frame)
+                        # Checks get the full context, so nothing is upscaled from the preview
+                        pending = submit_checks(inference, user, context, profile, settings, now, verify)
+                    pending_since = now
+                if pending is not None and now - pending_since > STALE_CHECK_INTERVALS * check_interval and \
+                        not all(f is None or f.done() for f in pending[1:]):
+                    # Never answered (e.g. lost with a worker): stop waiting so this
+                    # student is checked again instead of silently going unproctored
+                    logging.warning(f"Dropping a check for {user} unanswered after {now - pending_since:.1f}s")
+                    pending = None
+                if pending is not None and all(f is None or f.done() for f in pending[1:]):
+                    check_frame, verify_future, analyze_future = pending
+                    pending = None
                     # Continuous face verification during exam
-                    if registered_face_embedding is not None:
-                        result = face_auth.verify_face(frame, registered_face_embedding)
+                    result = inference_result(verify_future, 'verify_face')
+                    behavior_results = inference_result(analyze_future, 'analyze_frame')
+                    last_results = (result, behavior_results)
+                    if result is not None:
                         if result.get('face_detected', False):
                             if user in METRICS:
                                 METRICS[user]['face_visible_frames'] += 1
-                        if not result['verified']:
+                        if not result['verified'] and not replayed:
                             if increment_violation(user or 'unknown', 'face_mismatch'):
-                                add_alert(user or 'unknown', 'face_mismatch', frame=frame)
-                    if behavior_monitor is not None:
-                        behavior_results = behavior_monitor.analyze_frame(frame)
-                        frame = behavior_monitor.draw_results(frame, behavior_results)
+                                add_alert(user or 'unknown', 'face_mismatch', frame=check_frame)
+                    if behavior_results is not None:
+                        # The overlay is only for viewers; skip the copy and drawing otherwise
+                        if frame_hub.has_subscribers(user):
+                            frame = BehaviorMonitor.draw_results(frame, behavior_results)
+                    # Violations, alerts and the risk score only see real analyses
+                    if behavior_results is not None and not replayed:
                         # Log all BehaviorMonitor alerts (all are relevant)
                         for event, triggered in behavior_results.items():
                             if triggered:
                                 if increment_violation(user or 'unknown', event):
-                                    add_alert(user or 'unknown', event, frame=frame)
+                                    add_alert(user or 'unknown', event, frame=check_frame)
                         # --- METRICS: Multiple faces, phone, suspicious object ---
                         if user in METRICS:
                             if behavior_results.get('multiple_faces'):
@@ -362,29 +654,20 @@ def process_frame(user=None, role=None):
                             if behavior_results.get('suspicious_object_detected'):
                                 METRICS[user]['suspicious_object_detected'] = True
                 # --- Always update the video feed for smoothness ---
-                if not frame_queue.full():
-                    frame_queue.put(frame)
-                # If queue is full, skip adding new frames (drop this frame)
-                time.sleep(0.07)  # Increased sleep for less CPU usage
-            else:
-                time.sleep(0.07)
+                # No-op when nobody is watching; otherwise encoded once for all viewers
+                frame_hub.publish(user, frame)
         else:
             time.sleep(0.07)
 
-def generate_frames():
-    while True:
-        if not frame_queue.empty():
-            frame = frame_queue.get()
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-        else:
-            time.sleep(0.05)
-
 def monitor_audio(user=None, role=None, threshold=0.02, duration=1, samplerate=16000):
     global audio_alert
     import time
+    try:
+        import sounddevice as sd
+    except (ImportError, OSError) as e:
+        # OSError: PortAudio library not found
+        logging.warning(f"Audio proctoring disabled: {e}")
+        return
     while True:
         # Only run audio proctoring for students and when proctoring is active
         if role == 'admin' or not PROCTORING_ACTIVE.get(user, False):
@@ -415,12 +698,13 @@ def admin():
         return redirect(url_for('login'))
     conn = get_db()
     exams = conn.execute("SELECT * FROM exams").fetchall()
-    selected_exam_id = request.args.get('exam_id') or session.get('selected_exam_id')
-    if selected_exam_id:
-        session['selected_exam_id'] = selected_exam_id
-    else:
+    # Anything that is not an exam id (e.g. ?exam_id=abc) falls back to the first exam
+    selected_exam_id = parse_exam_id(request.args.get('exam_id'))
+    if selected_exam_id is None:
+        selected_exam_id = parse_exam_id(session.get('selected_exam_id'))
+    if selected_exam_id is None:
         selected_exam_id = exams[0]['id'] if exams else None
-        session['selected_exam_id'] = selected_exam_id
+    session['selected_exam_id'] = selected_exam_id
     questions = []
     if selected_exam_id:
         questions = conn.execute("SELECT * FROM questions WHERE exam_id = ?", (selected_exam_id,)).fetchall()
@@ -451,8 +735,9 @@ def admin():
     for q in questions:
         options = ', '.join([q['option1'], q['option2'], q['option3'], q['option4']])
         questions_fmt.append({'question': q['question'], 'options': options})
-    thresholds = dict(INTEGRITY_THRESHOLDS)
-    return render_template('admin.html', exams=exams, selected_exam_id=selected_exam_id, questions=questions_fmt, alerts=alerts, duration=duration[0] if duration else 30, results=results_with_risk, thresholds=thresholds)
+    thresholds = dict(INTEGRITY_THRESHOLDS.get())
+    exam_profile = EXAM_PROFILES.get().get(selected_exam_id, CURRENT_ACCURACY_LEVEL)
+    return render_template('admin.html', exams=exams, selected_exam_id=selected_exam_id, questions=questions_fmt, alerts=alerts, duration=duration[0] if duration else 30, results=results_with_risk, thresholds=thresholds, accuracy_levels=ACCURACY_LEVELS, exam_profile=exam_profile, proctored_exam_id=newest_exam_id())
 
 # --- Create Exam ---
 @app.route('/create_exam', methods=['POST'])
@@ -508,7 +793,8 @@ def add_question():
             'answer': q[5]
         }
     flash('Question added successfully!', 'success')
-    return render_template('admin.html', exams=[], selected_exam_id=exam_id, questions=[preview] if preview else [], alerts=[], duration=30, results=[], thresholds={})
+    exam_profile = EXAM_PROFILES.get().get(parse_exam_id(exam_id), CURRENT_ACCURACY_LEVEL)
+    return render_template('admin.html', exams=[], selected_exam_id=parse_exam_id(exam_id), questions=[preview] if preview else [], alerts=[], duration=30, results=[], thresholds={}, accuracy_levels=ACCURACY_LEVELS, exam_profile=exam_profile, proctored_exam_id=newest_exam_id())
 
 # --- Bulk Upload Questions ---
 @app.route('/upload_questions', methods=['POST'])
@@ -559,18 +845,41 @@ def set_exam_duration():
     conn.close()
     return redirect(url_for('admin'))
 
+@app.route('/set_exam_profile', methods=['POST'])
+def set_exam_profile():
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('login'))
+    exam_id = request.form.get('exam_id')
+    profile = request.form.get('accuracy_profile')
+    if not exam_id or not exam_id.isdigit() or profile not in ACCURACY_LEVELS:
+        flash('Choose an exam and a valid accuracy profile.', 'danger')
+        return redirect(url_for('admin'))
+    conn = get_db()
+    conn.execute('UPDATE exams SET accuracy_profile = ? WHERE id = ?', (profile, int(exam_id)))
+    conn.commit()
+    conn.close()
+    # Models load in the background; running sessions switch over once they are ready
+    inference = warmup.get('inference', timeout=0)
+    if inference is not None:
+        inference.prepare_profile(profile)
+    EXAM_PROFILES.invalidate()
+    flash(f'Accuracy profile set to {profile}.', 'success')
+    return redirect(url_for('admin', exam_id=exam_id))
+
 @app.route('/set_thresholds', methods=['POST'])
 def set_thresholds():
     if 'username' not in session or session.get('role') != 'admin':
         return redirect(url_for('login'))
     changed = False
-    for key in INTEGRITY_THRESHOLDS.keys():
+    thresholds = dict(INTEGRITY_THRESHOLDS.get())
+    for key in thresholds.keys():
         val = request.form.get(key)
         if val is not None and val.isdigit():
-            INTEGRITY_THRESHOLDS[key] = int(val)
+            thresholds[key] = int(val)
             changed = True
     if changed:
-        save_thresholds(INTEGRITY_THRESHOLDS)
+        save_thresholds(thresholds)
+        INTEGRITY_THRESHOLDS.invalidate()
         flash('Integrity thresholds updated!', 'success')
     return redirect(url_for('admin'))
 
@@ -621,16 +930,42 @@ def student():
     conn.close()
     return render_template('student.html', questions=questions)
 
+def feed_user():
+    """Whose stream to show: students see their own, admins may pick one with ?user="""
+    if session.get('role') == 'admin' and request.args.get('user'):
+        return request.args.get('user')
+    return session.get('username')
+
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(),
+    return Response(frame_hub.subscribe(feed_user()),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/register_video_feed')
 def register_video_feed():
-    return Response(generate_frames(),
+    return Response(frame_hub.subscribe(feed_user()),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/admin/perf_stats')
+def perf_stats():
+    if 'username' not in session or session.get('role') != 'admin':
+        return jsonify({'status': 'forbidden'}), 403
+    inference = warmup.get('inference', timeout=0)
+    return jsonify({
+        # Under serve.py only the sessions on this web worker are listed
+        'worker_pid': os.getpid(),
+        'preview': frame_hub.stats(),
+        'inference': inference.stats() if inference is not None else None,
+        'warmup': warmup.status(),
+        'embedding_cache': embedding_cache.stats(),
+        'load': load_controller.stats(),
+        'models': model_registry.stats(),
+        'memory': process_memory(),
+        'motion_gates': {user: gate.stats() for user, gate in list(MOTION_GATES.items())},
+        'risk_scheduler': risk_scheduler.stats(),
+        'frame_quality': {user: dict(m.get('quality_events', {})) for user, m in list(METRICS.items())},
+    })
+
 
 # --- Start Exam: Connects to exam_questions page ---
 @app.route('/start_exam', methods=['POST'])
@@ -644,17 +979,16 @@ def start_exam():
         if not username:
             return jsonify({"status": "unauthorized"}), 401
 
-        stored_embedding = get_face_embedding(username)
-        if stored_embedding is None:
+        registered_embedding = embedding_cache.get(username)
+        if registered_embedding is None:
             return jsonify({"status": "no_embedding"}), 400
 
-        # Convert to numpy array if stored as binary
-        if isinstance(stored_embedding, (bytes, bytearray)):
-            registered_embedding = np.frombuffer(stored_embedding, dtype=np.float32)
-        else:
-            registered_embedding = stored_embedding
+        # Proctor with the chosen exam's profile (defaults to the newest exam)
+        body = request.get_json(silent=True)
+        exam_id = parse_exam_id(body.get('exam_id')) if isinstance(body, dict) else None
+        SESSION_EXAMS[username] = exam_id if exam_id is not None else newest_exam_id()
 
-        init_result = initialize_system(registered_embedding)
+        init_result = initialize_system(registered_embedding, username)
         if init_result is not None:
             return init_result
 
@@ -770,6 +1104,17 @@ def exam_questions():
         conn.close()
         session.pop('current_exam_page', None)  # Remove marker after submission
         PROCTORING_ACTIVE[username] = False  # Deactivate proctoring after exam
+        remote_source = SESSION_CAMERAS.pop(username, None)
+        if remote_source is not None:
+            remote_source.release()
+        frame_hub.close(username)
+        SESSION_EMBEDDINGS.pop(username, None)
+        SESSION_EXAMS.pop(username, None)
+        MOTION_GATES.pop(username, None)
+        risk_scheduler.close(username)
+        inference = warmup.get('inference', timeout=0)
+        if inference is not None:
+            inference.close_session(username)
         reset_violations(session.get('username'))  # Reset violation counts after exam
         # Clean up metrics for this user
         if username in METRICS:
@@ -780,10 +1125,82 @@ def exam_questions():
     conn.close()
     return render_template('exam_questions.html', questions=questions, duration=duration)
 
+# --- Frame ingestion: each student's browser uploads its own webcam frames ---
+@app.route('/ingest/negotiate', methods=['POST'])
+@limiter.exempt
+def ingest_negotiate():
+    if session.get('role') != 'student':
+        return jsonify({"status": "forbidden"}), 403
+    source = SESSION_CAMERAS.get(session.get('username'))
+    if source is None:
+        return jsonify({"status": "no_session"}), 409
+    wanted = request.get_json(silent=True)
+    if wanted is None:
+        wanted = {}
+    if not isinstance(wanted, dict):
+        return jsonify({"status": "bad_request"}), 400
+    # Never accept more than the server is willing to decode per seat, nor a
+    # degenerate size or rate (a zero width would break every later frame)
+    try:
+        width, height, fps = (
+            max(INGEST_SETTINGS['min_' + key], min(int(wanted.get(key, INGEST_SETTINGS[key])), INGEST_SETTINGS[key]))
+            for key in ('width', 'height', 'fps')
+        )
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"status": "bad_request"}), 400
+    source.width, source.height, source.fps = width, height, fps
+    return jsonify({"status": "success", **source.settings(),
+                    "jpeg_quality": INGEST_SETTINGS['jpeg_quality'],
+                    "endpoint": url_for('ingest_frame')})
+
+@app.route('/ingest_frame', methods=['POST'])
+@limiter.exempt
+def ingest_frame():
+    """
+    Accept webcam frames for the logged-in student.
+    Either one JPEG per request (Content-Type: image/jpeg), or a long-lived chunked
+    upload of length-prefixed JPEGs (Content-Type: application/x-jpeg-stream,
+    each frame preceded by its size as a 4-byte big-endian integer).
+    """
+    if session.get('role') != 'student':
+        return jsonify({"status": "forbidden"}), 403
+    source = SESSION_CAMERAS.get(session.get('username'))
+    if source is None:
+        return jsonify({"status": "no_session"}), 409
+    max_bytes = INGEST_SETTINGS['max_frame_bytes']
+    if request.mimetype == 'application/x-jpeg-stream':
+        accepted = 0
+        stream = request.stream
+        while True:
+            header = stream.read(4)
+            if len(header) < 4:
+                break
+            (size,) = struct.unpack('>I', header)
+            if size > max_bytes:
+                return jsonify({"status": "frame_too_large", "accepted": accepted}), 413
+            data = stream.read(size)
+            if len(data) < size:
+                break
+            # Frames beyond the negotiated fps are dropped before decoding
+            if source.push_jpeg(data):
+                accepted += 1
+        return jsonify({"status": "success", "accepted": accepted})
+    data = request.get_data(cache=False)
+    if len(data) > max_bytes:
+        return jsonify({"status": "frame_too_large"}), 413
+    pushed = source.push_jpeg(data)
+    if pushed is None:
+        return jsonify({"status": "too_fast", **source.settings()}), 429
+    if not pushed:
+        return jsonify({"status": "bad_frame"}), 400
+    return jsonify({"status": "success"})
+
 @app.route('/verify_identity', methods=['POST'])
 def verify_identity():
-    if camera and face_auth:
-        frame = camera.get_frame()
+    source = get_session_camera(session.get('username'))
+    face_auth = warmup.get('face_auth', timeout=0)
+    if source and face_auth:
+        frame = source.get_frame()
         if frame is not None:
             result = face_auth.verify_face(frame)
             return jsonify({"verified": bool(result)})
@@ -807,8 +1224,9 @@ def screen_activity():
         METRICS[username]['tab_switch_count'] = METRICS[username].get('tab_switch_count', 0) + 1
     # Only log the alert if not 'You have left the exam screen!' or if user is not admin
     if data.get("event") == "You have left the exam screen!":
-        # Do not log this for admin or anywhere else
-        pass
+        # Do not log this for admin or anywhere else, but still raise this
+        # student's check rate (increment_violation does that for the others)
+        risk_scheduler.record_event(username, 'screen_activity')
     else:
         if increment_violation(username, 'screen_activity'):
             add_alert(username, 'screen_activity')
@@ -819,9 +1237,6 @@ def screen_activity():
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     import logging
-    global face_auth
-    if face_auth is None:
-        face_auth = FaceAuthenticator()
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
@@ -853,11 +1268,14 @@ def login():
                 img = Image.open(BytesIO(img_bytes)).convert('RGB')
                 frame = np.array(img)
                 frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                stored_embedding = get_face_embedding(username)
+                stored_embedding = embedding_cache.get(username)
                 if stored_embedding is None:
                     logging.warning(f"No face embedding found for {username}")
                     return render_template('login.html', error="No face embedding found for this user. Please contact admin.")
-                result = face_auth.verify_face(frame, stored_embedding)
+                face_auth = warmup.get('face_auth', timeout=FACE_MODEL_WAIT)
+                if face_auth is None:
+                    return render_template('login.html', error=FACE_MODEL_NOT_READY)
+                result = face_auth.verify_face(frame, stored_embedding, stored_normalized=True)
                 logging.info(f"Face verification result for {username}: {result}")
                 if not result['verified']:
                     logging.warning(f"Face not verified for {username}")
@@ -883,9 +1301,6 @@ def logout():
 @limiter.limit("5 per minute")
 @app.route('/register', methods=['GET', 'POST'])
 def register():
-    global face_auth
-    if face_auth is None:
-        face_auth = FaceAuthenticator()
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
@@ -901,10 +1316,21 @@ def register():
                 img = Image.open(BytesIO(img_bytes)).convert('RGB')
                 frame = np.array(img)
                 frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                face_auth = warmup.get('face_auth', timeout=FACE_MODEL_WAIT)
+                if face_auth is None:
+                    return render_template('register.html', error=FACE_MODEL_NOT_READY)
                 result = face_auth.verify_face(frame)
                 if not result['verified'] or 'encoding' not in result:
                     return render_template('register.html', error="Face not detected or not verified. Please try again.")
                 embedding_blob = result['encoding']
+                # Flag faces that already belong to another account (look-alikes such
+                # as twins included) for the administrator to review
+                embedding = face_auth.blob_to_embedding(embedding_blob)
+                # Includes enrolments made through other web workers
+                matches = embedding_index.search_enrolled(embedding, k=1, exclude=username)
+                duplicate_of = None
+                if matches and matches[0][1] > DUPLICATE_FACE_SIMILARITY:
+                    duplicate_of, similarity = matches[0]
                 # Try to add user
                 try:
                     success = add_user_with_embedding(username, password, embedding_blob, role)
@@ -912,6 +1338,13 @@ def register():
                     return render_template('register.html', error=f"Database error: {db_exc}")
                 if not success:
                     return render_template('register.html', error="Username already exists.")
+                embedding_index.add(username, embedding)
+                embedding_cache.invalidate(username)
+                if duplicate_of is not None:
+                    logging.warning(f"Registration of {username} matches existing user {duplicate_of} (similarity {similarity:.2f})")
+                    # One alert on each account, so the admin sees both names together
+                    add_alert(username, 'duplicate_identity', frame=frame)
+                    add_alert(duplicate_of, 'duplicate_identity')
                 # Double-check user was stored
                 import sqlite3
                 try:
@@ -19,6 +19,38 @@ PROCESSING_INTERVALS = {
     'system_monitor': 5.0    # Monitor system every 5 seconds
 }
 
+# Motion gate: heavy checks are skipped while the scene is static
+MOTION_GATE_SETTINGS = {
+    'pixel_threshold': 15,            # Grey levels a pixel must change by
+    'changed_fraction': 0.02,         # Share of pixels that must change
+    'keep_alive': 10.0                # Run a full check at least this often (seconds)
+}
+
+# Risk-adaptive check scheduling across all students on this node
+RISK_SCHEDULING = {
+    'node_checks_per_second': 8.0,    # Heavy checks the node can afford per second
+    'alert_window': 60,               # Seconds a student stays 'hot' after an event
+    'clean_after': 120,               # Seconds without events before a student is 'clean'
+    'hot_interval_scale': 0.5,        # Hot students are checked twice as often
+    'clean_interval_scale': 2.0       # Clean students half as often
+}
+
+# Frames too blurred, dark or overexposed for face verification are skipped
+QUALITY_GATE = {
+    'min_sharpness': 20.0,            # Laplacian variance of the 160-wide grey thumbnail
+    'min_brightness': 40,             # Mean grey level
+    'max_brightness': 215,
+    'max_clipped_fraction': 0.35      # Share of pixels crushed to black or blown to white
+}
+QUALITY_ESCALATE_AFTER = 20.0         # Seconds of unusable frames before a camera_obstructed violation
+
+# Face verification re-detects only around the student's last face box
+FACE_TRACKING = {
+    'roi_det_size': (128, 128),       # Detector input for the face crop (multiple of 32)
+    'padding': 0.6,                   # Crop margin around the last box, as a share of its size
+    'refresh_every': 10               # Full-frame detection at least every N verifications
+}
+
 # Model Settings
 MODEL_SETTINGS = {
     'face_model': 'buffalo_s',        # Smaller model
@@ -67,6 +99,10 @@ def get_optimized_settings():
     return {
         'camera': CAMERA_SETTINGS,
         'intervals': PROCESSING_INTERVALS,
+        'motion_gate': MOTION_GATE_SETTINGS,
+        'risk_scheduling': RISK_SCHEDULING,
+        'quality_gate': QUALITY_GATE,
+        'face_tracking': FACE_TRACKING,
         'models': MODEL_SETTINGS,
         'memory': MEMORY_SETTINGS,
         'audio': AUDIO_SETTINGS,
@@ -0,0 +1,113 @@
+"""
+Production entry point: one parent process loads the models and read-only tables,
+then forks web workers that share those pages copy-on-write.
+
+    EXAMGUARD_WEB_WORKERS=4 PORT=5000 python serve.py
+
+Worker i listens on PORT + i. A student's proctoring state (uploaded frames,
+checks, preview) lives in the worker that started their exam, so put a proxy in
+front that keeps each client on one worker, e.g. nginx:
+
+    upstream examguard {
+        ip_hash;
+        server 127.0.0.1:5000;
+        server 127.0.0.1:5001;
+        ...
+    }
+
+State shared between workers goes through the database: integrity thresholds and
+exam accuracy profiles are re-read every few seconds (app.SETTINGS_TTL), and the
+duplicate-face index is synced from the users table before each registration.
+These admin features still see one worker only:
+  - /video_feed?user=... shows students proctored on the admin's own worker;
+  - /admin/perf_stats reports that worker's sessions, models and memory
+    (its pid is included), and /alerts its in-memory alert list;
+  - violation counts live with the student's worker, as does the student.
+Use one worker (or reach each worker's port directly) to watch every student.
+
+The parent restarts workers that die and logs every worker's RSS, PSS and shared
+memory every EXAMGUARD_MEMORY_REPORT_SECONDS.
+"""
+import gc
+import os
+import sys
+import time
+import signal
+import logging
+
+os.environ.setdefault("EXAMGUARD_PRELOAD", "1")
+
+import app as examguard
+from src.utils.memory_report import process_memory, workers_memory
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+BASE_PORT = int(os.environ.get("PORT", 5000))
+WORKERS = int(os.environ.get("EXAMGUARD_WEB_WORKERS", 2))
+MEMORY_REPORT_SECONDS = float(os.environ.get("EXAMGUARD_MEMORY_REPORT_SECONDS", 60))
+
+
+def run_worker(index):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    from werkzeug.serving import make_server
+    examguard.start_background_services()
+    server = make_server(HOST, BASE_PORT + index, examguard.app, threaded=True)
+    logging.info(f"Worker {index} (pid {os.getpid()}) serving on port {BASE_PORT + index}")
+    server.serve_forever()
+
+
+def spawn(index):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(index)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main():
+    started = time.time()
+    examguard.preload_models()
+    # Move everything loaded so far out of the GC's generations; otherwise the
+    # first collection in each worker writes to (and un-shares) those pages
+    gc.collect()
+    gc.freeze()
+    logging.info(f"Models preloaded in {time.time() - started:.1f}s; parent memory {process_memory()}")
+
+    children = {spawn(i): i for i in range(WORKERS)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    last_report = 0
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            index = children.pop(pid)
+            if not stopping:
+                logging.error(f"Worker {index} (pid {pid}) exited with status {status}; restarting")
+                children[spawn(index)] = index
+            continue
+        if not stopping and time.time() - last_report >= MEMORY_REPORT_SECONDS:
+            last_report = time.time()
+            logging.info(f"Worker memory: {workers_memory(sorted(children))}")
+        time.sleep(0.5)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
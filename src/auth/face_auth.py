@@ -1,16 +1,24 @@
-import cv2
 import numpy as np
-import insightface
-from insightface.app import FaceAnalysis
+from src.utils.model_registry import get_face_models
+from src.utils.frame_context import FrameContext
 
 class FaceAuthenticator:
-    def __init__(self):
+    def __init__(self, model_name='buffalo_l', det_size=(320, 320), modules=('detection', 'recognition'),
+                 detector_model=None, det_thresh=0.5):
         """
         Initialize face detection and recognition models optimized for CPU
-        Using InsightFace which provides robust face recognition capabilities
+        Using InsightFace which provides robust face recognition capabilities.
+        Only the listed InsightFace modules are loaded; landmark and gender/age
+        models are never needed for verification. Use modules=('detection',)
+        for an instance that only counts faces.
+        detector_model swaps in the face detector from another model pack while
+        recognition stays on model_name, keeping embeddings comparable with the
+        ones stored at registration.
+        Models come from the shared registry, so every authenticator (and
+        BehaviorMonitor) in the process uses one copy of each network.
         """
-        self.face_app = FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])
-        self.face_app.prepare(ctx_id=0, det_size=(320, 320))
+        self.modules = tuple(modules)
+        self.face_app = get_face_models(model_name, det_size, self.modules, det_thresh, detector_model)
 
         # Store registered face embeddings
         self.registered_embeddings = {}
@@ -31,23 +39,78 @@ class FaceAuthenticator:
             return None
         return np.frombuffer(blob, dtype=np.float32)
 
+    def detect_faces(self, frame):
+        """
+        Run face detection only.
+        Returns (bboxes, kpss): an (N, 5) array of x1, y1, x2, y2, score and the keypoints.
+        frame is a BGR image or a FrameContext, whose RGB copy is reused.
+        """
+        rgb = FrameContext.of(frame).rgb()
+        return self.face_app.det_model.detect(rgb, max_num=0, metric='default')
+
+    def count_faces(self, frame):
+        """Cheap face count: detection only, no recognition"""
+        bboxes, _ = self.detect_faces(frame)
+        return int(bboxes.shape[0])
+
+    def warm_up(self):
+        """Run each loaded model once on a blank input so ONNX Runtime finishes initialising"""
+        self.detect_faces(np.zeros((240, 320, 3), dtype=np.uint8))
+        rec_model = self.face_app.models.get('recognition')
+        if rec_model is not None:
+            size = rec_model.input_size[0]
+            rec_model.get_feat([np.zeros((size, size, 3), dtype=np.uint8)])
+
     def get_face_encoding(self, frame):
         """
         Extract a face embedding using InsightFace.
         Returns a numpy array or None if no face detected.
         """
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        faces = self.face_app.get(rgb)
-        if not faces:
-            return None
-        # Use the face with the largest bounding box area
-        face = max(faces, key=lambda f: f.bbox[2]*f.bbox[3])
-        return face.embedding
+        return self.get_face_encodings([frame])[0]
 
-    def compare_encodings(self, encoding1, encoding2, tolerance=0.4):
+    def get_face_encodings(self, frames, trackers=None):
+        """
+        Extract one embedding per frame (None where no face is found).
+        Detection runs per frame; recognition runs once on all aligned faces.
+        Frames may be FrameContexts: faces are found and aligned on the full-size
+        RGB copy, converted once and shared with the behaviour checks.
+        trackers optionally gives a FaceTracker (or None) per frame, so a session's
+        face is searched for around where it last was.
+        """
+        from insightface.utils import face_align
+        if 'recognition' not in self.face_app.models:
+            raise RuntimeError("FaceAuthenticator was created without the recognition module")
+        det_model = self.face_app.det_model
+        rec_model = self.face_app.models['recognition']
+        crops = []
+        owners = []
+        trackers = trackers or [None] * len(frames)
+        for i, (frame, tracker) in enumerate(zip(frames, trackers)):
+            rgb = FrameContext.of(frame).rgb()
+            if tracker is not None:
+                bboxes, kpss = tracker.detect(det_model, rgb)
+            else:
+                bboxes, kpss = det_model.detect(rgb, max_num=0, metric='default')
+            if bboxes.shape[0] == 0 or kpss is None:
+                continue
+            # Use the face with the largest bounding box area
+            areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+            best = int(np.argmax(areas))
+            crops.append(face_align.norm_crop(rgb, landmark=kpss[best], image_size=rec_model.input_size[0]))
+            owners.append(i)
+        encodings = [None] * len(frames)
+        if crops:
+            feats = rec_model.get_feat(crops)
+            for i, feat in zip(owners, feats):
+                encodings[i] = feat.flatten()
+        return encodings
+
+    def compare_encodings(self, encoding1, encoding2, tolerance=0.4, normalized=False):
         """
         Compare two face encodings using cosine similarity.
         Accepts numpy arrays or BLOBs (bytes).
+        Pass normalized=True when encoding2 is already a unit-norm template
+        (e.g. from EmbeddingCache) to skip converting and renormalising it.
         Returns True if similarity is above (1-tolerance).
         """
         if encoding1 is None or encoding2 is None:
@@ -55,25 +118,31 @@ class FaceAuthenticator:
         # Convert BLOBs to numpy arrays if needed
         if isinstance(encoding1, bytes):
             encoding1 = self.blob_to_embedding(encoding1)
-        if isinstance(encoding2, bytes):
+        if not normalized and isinstance(encoding2, bytes):
             encoding2 = self.blob_to_embedding(encoding2)
         # Normalize vectors
         encoding1 = encoding1 / np.linalg.norm(encoding1)
-        encoding2 = encoding2 / np.linalg.norm(encoding2)
+        if not normalized:
+            encoding2 = encoding2 / np.linalg.norm(encoding2)
         similarity = np.dot(encoding1, encoding2)
         return similarity > (1 - tolerance)
 
-    def verify_face(self, frame, stored_encoding=None, tolerance=0.4):
+    def verify_face(self, frame, stored_encoding=None, tolerance=0.4, stored_normalized=False):
         """
         Verify if the detected face matches the registered face encoding.
         Accepts stored_encoding as numpy array or BLOB.
         Returns dict with verification result and message.
         """
-        encoding = self.get_face_encoding(frame)
+        return self.verification_result(self.get_face_encoding(frame), stored_encoding, tolerance, stored_normalized)
+
+    def verification_result(self, encoding, stored_encoding=None, tolerance=0.4, stored_normalized=False):
+        """
+        Build the verify_face() result for an already extracted encoding.
+        """
         if encoding is None:
             return {"verified": False, "message": "No face detected"}
         if stored_encoding is not None:
-            if self.compare_encodings(encoding, stored_encoding, tolerance):
+            if self.compare_encodings(encoding, stored_encoding, tolerance, normalized=stored_normalized):
                 return {"verified": True, "message": "Face verified"}
             else:
                 return {"verified": False, "message": "Face does not match"}
@@ -0,0 +1,104 @@
+import logging
+import threading
+import numpy as np
+from performance_config import FACE_TRACKING
+
+
+class FaceTracker:
+    def __init__(self, roi_det_size=FACE_TRACKING['roi_det_size'], padding=FACE_TRACKING['padding'],
+                 refresh_every=FACE_TRACKING['refresh_every']):
+        """
+        Remembers where one student's face was at the last verification. The next
+        detection runs on a padded square crop around that box at the small
+        roi_det_size instead of on the whole frame; the whole frame is searched
+        again when the crop has no face, or after refresh_every crop detections.
+        """
+        self.roi_det_size = tuple(roi_det_size)
+        self.padding = padding
+        self.refresh_every = refresh_every
+        self.box = None  # x1, y1, x2, y2 of the last face, in frame coordinates
+        self.since_full = 0
+        self.roi_enabled = True
+        self.roi_hits = 0
+        self.roi_misses = 0
+        self.full_detections = 0
+
+    def _roi(self, shape):
+        x1, y1, x2, y2 = self.box
+        side = max(x2 - x1, y2 - y1) * (1 + 2 * self.padding)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        height, width = shape[:2]
+        left, top = max(0, int(cx - side / 2)), max(0, int(cy - side / 2))
+        right, bottom = min(width, int(cx + side / 2)), min(height, int(cy + side / 2))
+        return left, top, right, bottom
+
+    def _remember(self, bboxes):
+        if bboxes.shape[0] == 0:
+            self.box = None
+            return
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+        self.box = bboxes[int(np.argmax(areas)), :4].copy()
+
+    def detect(self, det_model, rgb):
+        """Same (bboxes, kpss) as det_model.detect on the whole frame, in frame coordinates"""
+        if self.roi_enabled and self.box is not None and self.since_full < self.refresh_every:
+            left, top, right, bottom = self._roi(rgb.shape)
+            if right - left >= 32 and bottom - top >= 32:
+                try:
+                    bboxes, kpss = det_model.detect(rgb[top:bottom, left:right], input_size=self.roi_det_size,
+                                                    max_num=0, metric='default')
+                except Exception as e:
+                    # e.g. a detector exported with a fixed input size
+                    logging.warning(f"Face ROI detection disabled: {e}")
+                    self.roi_enabled = False
+                    bboxes = None
+                if bboxes is not None and bboxes.shape[0] > 0 and kpss is not None:
+                    bboxes = bboxes.copy()
+                    bboxes[:, [0, 2]] += left
+                    bboxes[:, [1, 3]] += top
+                    kpss = kpss + np.array([left, top], dtype=kpss.dtype)
+                    self.since_full += 1
+                    self.roi_hits += 1
+                    self._remember(bboxes)
+                    return bboxes, kpss
+                self.roi_misses += 1
+        bboxes, kpss = det_model.detect(rgb, max_num=0, metric='default')
+        self.since_full = 0
+        self.full_detections += 1
+        self._remember(bboxes)
+        return bboxes, kpss
+
+    def stats(self):
+        return {
+            'roi_hits': self.roi_hits,
+            'roi_misses': self.roi_misses,
+            'full_detections': self.full_detections,
+        }
+
+
+class FaceTrackers:
+    def __init__(self):
+        """One FaceTracker per proctoring session"""
+        self.lock = threading.Lock()
+        self.trackers = {}
+
+    def open(self, session_id):
+        with self.lock:
+            self.trackers[session_id] = FaceTracker()
+
+    def close(self, session_id):
+        with self.lock:
+            self.trackers.pop(session_id, None)
+
+    def get(self, session_id):
+        with self.lock:
+            return self.trackers.get(session_id)
+
+    def stats(self):
+        with self.lock:
+            trackers = list(self.trackers.values())
+        totals = {'sessions': len(trackers), 'roi_hits': 0, 'roi_misses': 0, 'full_detections': 0}
+        for tracker in trackers:
+            for key, value in tracker.stats().items():
+                totals[key] += value
+        return totals
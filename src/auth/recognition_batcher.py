@@ -0,0 +1,116 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+def batch_settings_from_env():
+    """Batch size and latency budget, overridable per deployment"""
+    return {
+        "max_batch_size": int(os.environ.get("EXAMGUARD_BATCH_MAX_SIZE", 16)),
+        "max_wait_ms": float(os.environ.get("EXAMGUARD_BATCH_MAX_WAIT_MS", 30)),
+    }
+
+
+class RecognitionBatcher:
+    def __init__(self, face_auth, max_batch_size=16, max_wait_ms=30):
+        """
+        Collects face verification requests from all sessions for up to max_wait_ms
+        (or until max_batch_size are waiting) and runs them through InsightFace together,
+        so recognition executes as one ONNX Runtime batch instead of frame by frame.
+        """
+        self.face_auth = face_auth
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = deque()
+        self.cond = threading.Condition()
+        self.batches = 0
+        self.requests_done = 0
+        self.largest_batch = 0
+        self.total_batch_time = 0.0
+        self.total_queue_wait = 0.0
+        self.last_batch = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, frame, tracker=None):
+        """Future resolving to the frame's face embedding (or None); tracker is the session's FaceTracker"""
+        future = Future()
+        with self.cond:
+            self.requests.append((frame, future, time.time(), tracker))
+            self.cond.notify()
+        return future
+
+    def submit_verify(self, frame, stored_encoding=None, tolerance=0.4, stored_normalized=False, tracker=None):
+        """Future resolving to the same dict FaceAuthenticator.verify_face returns"""
+        result = Future()
+
+        def finish(encoding_future):
+            try:
+                encoding = encoding_future.result()
+                result.set_result(self.face_auth.verification_result(
+                    encoding, stored_encoding, tolerance, stored_normalized))
+            except Exception as e:
+                result.set_exception(e)
+
+        self.submit(frame, tracker).add_done_callback(finish)
+        return result
+
+    def _next_batch(self):
+        with self.cond:
+            while not self.requests:
+                self.cond.wait()
+            # The oldest request sets the deadline for everything batched with it
+            deadline = self.requests[0][2] + self.max_wait
+            while len(self.requests) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            count = min(len(self.requests), self.max_batch_size)
+            return [self.requests.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.time()
+            try:
+                encodings = self.face_auth.get_face_encodings([frame for frame, _, _, _ in batch],
+                                                              [tracker for _, _, _, tracker in batch])
+            except Exception as e:
+                for _, future, _, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.time()
+            for (_, future, _, _), encoding in zip(batch, encodings):
+                future.set_result(encoding)
+            queue_wait = sum(started - queued for _, _, queued, _ in batch)
+            with self.cond:
+                self.batches += 1
+                self.requests_done += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self.total_batch_time += finished - started
+                self.total_queue_wait += queue_wait
+                self.last_batch = {
+                    "size": len(batch),
+                    "run_ms": round((finished - started) * 1000, 2),
+                    "avg_queue_wait_ms": round(queue_wait / len(batch) * 1000, 2),
+                }
+
+    def stats(self):
+        """Per-batch statistics for monitoring batching efficiency"""
+        with self.cond:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "queued": len(self.requests),
+                "batches": self.batches,
+                "requests": self.requests_done,
+                "mean_batch_size": round(self.requests_done / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "mean_batch_ms": round(self.total_batch_time / self.batches * 1000, 2) if self.batches else 0.0,
+                "mean_queue_wait_ms": round(self.total_queue_wait / self.requests_done * 1000, 2) if self.requests_done else 0.0,
+                "last_batch": self.last_batch,
+            }
@@ -1,16 +1,22 @@
 import cv2
+import copy
+import time
+import logging
 import numpy as np
-import mediapipe as mp
-from insightface.app import FaceAnalysis
+from src.utils.model_registry import get_face_models, get_yolo
+from src.monitoring.phone_detector import AsyncPhoneDetector
+from src.monitoring.yolo_onnx import YoloOnnxDetector, default_phone_model, CELL_PHONE
+from src.monitoring.face_geometry import landmarks_array, face_geometry
 from numpy.linalg import norm
-from src.utils.image_utils import resize_frame  # ensure this resizes frame to given width
-from ultralytics import YOLO  # Add YOLO for heavy phone detection
-from src.monitoring.audio_monitor import AudioMonitor  # Import AudioMonitor
+from src.utils.frame_context import FrameContext
 
 class BehaviorMonitor:
-    def __init__(self, registered_embedding, frame_skip=3, identity_threshold=0.45):
-        self.face_verifier = FaceAnalysis()
-        self.face_verifier.prepare(ctx_id=-1)  # Use -1 if you don’t have GPU
+    def __init__(self, registered_embedding, frame_skip=3, identity_threshold=0.45, enable_audio=True):
+        # Heavy imports (MediaPipe, sounddevice) happen here rather
+        # than at module import, so importing the app stays fast
+        import mediapipe as mp
+        # Same buffalo_l models FaceAuthenticator uses, shared through the registry
+        self.face_verifier = get_face_models('buffalo_l', det_size=(320, 320))
         self.frame_count = 0
         self.frame_skip = frame_skip
         self.identity_threshold = identity_threshold
@@ -19,6 +25,54 @@ class BehaviorMonitor:
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
+        self._create_trackers()
+        # Looking away: head turned or nodded past these angles (degrees); eyes closed below ear_closed
+        self.yaw_limit = 25.0
+        self.pitch_limit = 30.0
+        # Pixel-proportional EAR; 0.15 is where the old normalised-coordinate EAR
+        # crossed 0.2 on the 4:3 frames the cameras deliver (0.2 x 3/4)
+        self.ear_closed = 0.15
+        # The cascade's first stage counts faces at this detector input size
+        self.face_count_size = (160, 160)
+        # Shared by every per-session copy (for_session), so the report covers the process
+        self.cascade_stats = {name: {'runs': 0, 'skipped': 0, 'hits': 0, 'seconds': 0.0}
+                              for name, _, _ in self.CASCADE}
+        self.last_results = {
+            "looking_away": False,
+            "multiple_faces": False,
+            "eyes_closed": False,
+            "phone_detected": False,
+            "identity_mismatch": False,
+            "noise_detected": False
+        }
+        # Heavy model: YOLOv8 for phone detection, on ONNX Runtime once exported
+        # Without it (no yolov8n.onnx and no ultralytics) only the yolo stage is skipped
+        self.yolo_model = None
+        try:
+            self.yolo_model = get_yolo(default_phone_model())
+        except Exception as e:
+            logging.warning(f"YOLO phone detection unavailable, export yolov8n.onnx to enable it: {e}")
+        # YOLO runs on its own thread on each session's newest frame; each finished
+        # result is merged into the first analysis after it, however far apart they are
+        self.phone_detector = AsyncPhoneDetector(self.detect_phone_yolo)
+        # Hand crops: at least hand_roi_min px either side of the hand, run at hand_roi_input
+        self.hand_roi_min = 40
+        self.hand_roi_input = 160
+        self.phone_checked_at = None  # when the frame of the last merged YOLO result was submitted
+        # Audio monitor for noise/talking detection
+        self.audio_monitor = None
+        if enable_audio:
+            try:
+                from src.monitoring.audio_monitor import AudioMonitor
+                self.audio_monitor = AudioMonitor()
+                self.audio_monitor.start()
+            except Exception as e:
+                # No PortAudio or no input device: proctor without audio
+                logging.warning(f"Audio monitoring unavailable: {e}")
+                self.audio_monitor = None
+
+    def _create_trackers(self):
+        # FaceMesh and Pose carry temporal tracking state, so every student needs their own
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
             max_num_faces=1,
@@ -31,29 +85,58 @@ class BehaviorMonitor:
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        self.LEFT_EYE = [362, 385, 387, 263, 373, 380]
-        self.RIGHT_EYE = [33, 160, 158, 133, 153, 144]
-        self.last_results = {
-            "looking_away": False,
-            "multiple_faces": False,
-            "eyes_closed": False,
-            "phone_detected": False,
-            "identity_mismatch": False,
-            "noise_detected": False
-        }
-        # Heavy model: YOLOv8 for phone detection
-        self.yolo_model = YOLO('yolov8n.pt')
-        # Audio monitor for noise/talking detection
-        self.audio_monitor = AudioMonitor()
-        self.audio_monitor.start()
 
-    def analyze_frame(self, frame):
+    def for_session(self, registered_embedding, frame_skip=1):
+        """
+        Return a monitor for one student that shares this monitor's heavy models
+        (InsightFace, YOLO, audio) but has its own trackers and counters.
+        The caller already decides which frames are worth a check (frame cadence,
+        motion gate), so by default every frame it submits is analysed.
+        """
+        monitor = copy.copy(self)
+        monitor.registered_embedding = registered_embedding
+        monitor.frame_skip = frame_skip
+        monitor.frame_count = 0
+        monitor.last_results = dict.fromkeys(self.last_results, False)
+        monitor.phone_checked_at = None
+        monitor._create_trackers()
+        return monitor
+
+    def warm_up(self):
+        """Run every model once on a blank frame"""
+        blank = np.zeros((240, 320, 3), dtype=np.uint8)
+        self.face_verifier.det_model.detect(blank, max_num=0, metric='default')
+        self.face_verifier.det_model.detect(blank, input_size=self.face_count_size, max_num=0, metric='default')
+        self.face_mesh.process(blank)
+        self.pose.process(blank)
+        if self.yolo_model is not None:
+            self.detect_phone_yolo(blank)
+            self.detect_phone_yolo(blank, rois=[(0, 0, 80, 80), (160, 0, 240, 80)])
+
+    def close(self):
+        """Release this monitor's MediaPipe trackers"""
+        self.phone_detector.forget(self)
+        self.face_mesh.close()
+        self.pose.close()
+
+    def _is_noise(self):
+        return self.audio_monitor.is_noise() if self.audio_monitor is not None else False
+
+    def analyze_frame(self, frame, run_pose=True, run_yolo=True):
+        """
+        Runs the CASCADE of behaviour checks; run_pose/run_yolo let the load
+        controller shed the phone checks under pressure.
+        frame may be a FrameContext; its 320-wide BGR and RGB copies are built once
+        and shared with face verification instead of being converted again here.
+        """
         self.frame_count += 1
         if self.frame_count % self.frame_skip != 0:
-            self.last_results["noise_detected"] = self.audio_monitor.is_noise()
+            self.last_results["noise_detected"] = self._is_noise()
             return self.last_results
-        frame = resize_frame(frame, width=320)  # reduce size for performance
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        context = FrameContext.of(frame)
+        # Reduce size for performance; smaller sources are used as they are, never upscaled
+        frame = context.bgr(320)
+        rgb_frame = context.rgb(320)
         results = {
             "looking_away": False,
             "multiple_faces": False,
@@ -62,40 +145,152 @@ class BehaviorMonitor:
             "identity_mismatch": False,
             "noise_detected": False
         }
-        # Identity verification
-        results["identity_mismatch"] = not self._verify_identity(frame)
-        # Face behavior
-        face_results = self.face_mesh.process(rgb_frame)
-        if face_results.multi_face_landmarks:
-            if len(face_results.multi_face_landmarks) > 1:
-                results["multiple_faces"] = True
-            landmarks = face_results.multi_face_landmarks[0]
-            results["looking_away"] = self._check_head_pose(landmarks)
-            results["eyes_closed"] = self._check_eyes_closed(landmarks)
-        # Pose check (lightweight, continuous)
-        pose_results = self.pose.process(rgb_frame)
-        if pose_results.pose_landmarks:
-            results["phone_detected"] = self._check_phone_usage(pose_results.pose_landmarks)
-        # Heavy check: YOLO phone detection every 15 frames
-        if self.frame_count % 15 == 0:
-            if self.detect_phone_yolo(frame):
-                results["phone_detected"] = True
+        state = {
+            'frame': frame,
+            'rgb': rgb_frame,
+            'run_pose': run_pose,
+            'run_yolo': run_yolo,
+            'face_count': 0,
+            'hand_rois': None,
+        }
+        # Without a visible face a registered student counts as unverified, as before
+        results["identity_mismatch"] = self.registered_embedding is not None
+        for name, method, precondition in self.CASCADE:
+            counters = self.cascade_stats[name]
+            if precondition is not None and not precondition(self, state):
+                counters['skipped'] += 1
+                continue
+            started = time.perf_counter()
+            hit = getattr(self, method)(state, results)
+            counters['seconds'] += time.perf_counter() - started
+            counters['runs'] += 1
+            if hit:
+                counters['hits'] += 1
         # Audio check: noise/talking detection
-        results["noise_detected"] = self.audio_monitor.is_noise()
+        results["noise_detected"] = self._is_noise()
         self.last_results = results
         return results
 
-    def detect_phone_yolo(self, frame):
-        yolo_results = self.yolo_model(frame)
+    # Behaviour checks, cheapest first: (stage, method, precondition). A stage runs
+    # only when its precondition holds for what the earlier stages found
+    CASCADE = (
+        ('faces', '_stage_faces', None),
+        ('identity', '_stage_identity', lambda self, state: state['face_count'] > 0 and self.registered_embedding is not None),
+        ('face_mesh', '_stage_face_mesh', lambda self, state: state['face_count'] > 0),
+        # Someone else in view is already an alert; the hand heuristics add nothing
+        ('pose', '_stage_pose', lambda self, state: state['run_pose'] and state['face_count'] <= 1),
+        ('yolo', '_stage_yolo', lambda self, state: state['run_yolo'] and self.yolo_model is not None),
+    )
+
+    def _stage_faces(self, state, results):
+        """Face count from the SCRFD detector at a small input size"""
+        bboxes, _ = self.face_verifier.det_model.detect(state['rgb'], input_size=self.face_count_size,
+                                                        max_num=0, metric='default')
+        state['face_count'] = int(bboxes.shape[0])
+        results["multiple_faces"] = state['face_count'] > 1
+        return state['face_count'] > 0
+
+    def _stage_identity(self, state, results):
+        results["identity_mismatch"] = not self._verify_identity(state['frame'])
+        return results["identity_mismatch"]
+
+    def _stage_face_mesh(self, state, results):
+        face_results = self.face_mesh.process(state['rgb'])
+        if not face_results.multi_face_landmarks:
+            return False
+        frame = state['frame']
+        # The mesh is read into an array once; all geometry is vectorised from there
+        geometry = face_geometry(landmarks_array(face_results.multi_face_landmarks[0]),
+                                 aspect=frame.shape[1] / float(frame.shape[0]))
+        results["looking_away"] = bool(self._check_head_pose(geometry))
+        results["eyes_closed"] = bool(self._check_eyes_closed(geometry))
+        return results["looking_away"] or results["eyes_closed"]
+
+    def _stage_pose(self, state, results):
+        pose_results = self.pose.process(state['rgb'])
+        if not pose_results.pose_landmarks:
+            return False
+        results["phone_detected"] = self._check_phone_usage(pose_results.pose_landmarks)
+        state['hand_rois'] = self._hand_rois(pose_results.pose_landmarks, state['frame'].shape)
+        return results["phone_detected"]
+
+    def _stage_yolo(self, state, results):
+        """
+        Hands the frame to the YOLO thread and merges its latest answer, so this
+        stage's cost is only the hand-off (phone_detector.stats() has YOLO's own).
+        With pose, YOLO only looks around the hands; otherwise at the whole frame
+        """
+        self.phone_detector.submit(self, state['frame'], state['hand_rois'])
+        latest = self.phone_detector.latest(self)
+        if latest is None:
+            return False
+        detected, checked_at = latest
+        if checked_at == self.phone_checked_at:
+            return False  # Already merged into an earlier analysis
+        self.phone_checked_at = checked_at
+        if detected:
+            results["phone_detected"] = True
+        return detected
+
+    def cascade_report(self):
+        """Per-stage runs, skips, hit rate and mean cost, over every session of this process"""
+        report = {}
+        for name, _, _ in self.CASCADE:
+            counters = self.cascade_stats[name]
+            runs = counters['runs']
+            report[name] = {
+                'runs': runs,
+                'skipped': counters['skipped'],
+                'hit_rate': round(counters['hits'] / runs, 3) if runs else 0.0,
+                'mean_ms': round(counters['seconds'] / runs * 1000, 2) if runs else 0.0,
+            }
+        return report
+
+    def _hand_rois(self, landmarks, shape):
+        """
+        Square crops around each visible hand, extended past the wrist along the
+        forearm and sized from the shoulder width. None if no hand is visible.
+        """
+        h, w = shape[:2]
+        lm = landmarks.landmark
+        P = self.mp_pose.PoseLandmark
+        shoulder_width = abs(lm[P.LEFT_SHOULDER].x - lm[P.RIGHT_SHOULDER].x) * w
+        half = max(self.hand_roi_min, 0.6 * shoulder_width)
+        rois = []
+        for wrist, elbow in ((P.LEFT_WRIST, P.LEFT_ELBOW), (P.RIGHT_WRIST, P.RIGHT_ELBOW)):
+            if lm[wrist].visibility < 0.5:
+                continue
+            # A phone sits in the hand, beyond the wrist
+            cx = lm[wrist].x + 0.5 * (lm[wrist].x - lm[elbow].x)
+            cy = lm[wrist].y + 0.5 * (lm[wrist].y - lm[elbow].y)
+            x1, y1 = int(max(0, cx * w - half)), int(max(0, cy * h - half))
+            x2, y2 = int(min(w, cx * w + half)), int(min(h, cy * h + half))
+            if x2 - x1 >= 16 and y2 - y1 >= 16:
+                rois.append((x1, y1, x2, y2))
+        return rois or None
+
+    def detect_phone_yolo(self, frame, rois=None):
+        if rois:
+            # All hand crops go through YOLO together at a small input size
+            crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rois]
+            if isinstance(self.yolo_model, YoloOnnxDetector):
+                return self.yolo_model.contains_any(crops, CELL_PHONE, 0.4, size=self.hand_roi_input)
+            yolo_results = self.yolo_model(crops, imgsz=self.hand_roi_input, verbose=False)
+        elif isinstance(self.yolo_model, YoloOnnxDetector):
+            return self.yolo_model.contains(frame, CELL_PHONE, 0.4)
+        else:
+            yolo_results = self.yolo_model(frame)
         for result in yolo_results:
             for box in result.boxes:
                 cls = int(box.cls[0])
                 # COCO class 67 is 'cell phone'
-                if cls == 67 and box.conf[0] > 0.4:
+                if cls == CELL_PHONE and box.conf[0] > 0.4:
                     return True
         return False
 
     def _verify_identity(self, frame):
+        if self.registered_embedding is None:
+            return True
         faces = self.face_verifier.get(frame)
         for face in faces:
             live_embedding = face.embedding
@@ -106,24 +301,12 @@ class BehaviorMonitor:
                 return True
         return False
 
-    def _check_head_pose(self, landmarks):
-        nose = landmarks.landmark[1]
-        left_temple = landmarks.landmark[234]
-        right_temple = landmarks.landmark[454]
-        face_width = abs(left_temple.x - right_temple.x)
-        nose_offset = abs(nose.x - (left_temple.x + right_temple.x) / 2)
-        return nose_offset > face_width * 0.2
-
-    def _check_eyes_closed(self, landmarks):
-        def eye_aspect_ratio(eye_points):
-            v1 = abs(landmarks.landmark[eye_points[1]].y - landmarks.landmark[eye_points[5]].y)
-            v2 = abs(landmarks.landmark[eye_points[2]].y - landmarks.landmark[eye_points[4]].y)
-            h = abs(landmarks.landmark[eye_points[0]].x - landmarks.landmark[eye_points[3]].x)
-            ear = (v1 + v2) / (2.0 * h)
-            return ear
-        left_ear = eye_aspect_ratio(self.LEFT_EYE)
-        right_ear = eye_aspect_ratio(self.RIGHT_EYE)
-        return (left_ear + right_ear) / 2 < 0.2
+    def _check_head_pose(self, geometry):
+        """geometry is face_geometry() output; works element-wise on batches too"""
+        return (np.abs(geometry['yaw']) > self.yaw_limit) | (np.abs(geometry['pitch']) > self.pitch_limit)
+
+    def _check_eyes_closed(self, geometry):
+        return geometry['ear'] < self.ear_closed
 
     def _check_phone_usage(self, landmarks):
         left_wrist = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_WRIST]
@@ -136,7 +319,8 @@ class BehaviorMonitor:
         )
         return wrist_raised
 
-    def draw_results(self, frame, results):
+    @staticmethod
+    def draw_results(frame, results):
         output = frame.copy()
         y_pos = 30
         font = cv2.FONT_HERSHEY_SIMPLEX
@@ -0,0 +1,48 @@
+"""
+Head pose and eye openness from MediaPipe Face Mesh landmarks, computed with
+NumPy on (468, 3) landmark arrays or on stacks of them (..., 468, 3), so the
+live checks and offline re-analysis of stored landmarks share one code path.
+"""
+import numpy as np
+
+# p1..p6 of the eye aspect ratio for each eye: corner, two upper, corner, two lower
+EYES = np.array([
+    [362, 385, 387, 263, 373, 380],  # left
+    [33, 160, 158, 133, 153, 144],   # right
+])
+NOSE_TIP = 1
+LEFT_TEMPLE, RIGHT_TEMPLE = 234, 454
+FOREHEAD, CHIN = 10, 152
+
+
+def landmarks_array(landmarks):
+    """MediaPipe NormalizedLandmarkList -> (N, 3) float32 array of x, y, z"""
+    return np.array([(p.x, p.y, p.z) for p in landmarks.landmark], dtype=np.float32)
+
+
+def face_geometry(points, aspect=1.0):
+    """
+    Geometry of one face (N, 3) or a batch (..., N, 3) of normalised landmarks.
+    aspect is the frame's width / height; x and z are scaled by it so distances are
+    proportional to pixels. Returns arrays shaped like the batch:
+    'ear' (mean eye aspect ratio of both eyes), 'nose_offset' (nose distance from
+    the temples' midpoint, as a share of face width), and 'yaw' / 'pitch' in
+    degrees (0 when facing the camera), from the temple and forehead-chin axes.
+    """
+    points = np.asarray(points, dtype=np.float32) * np.array([aspect, 1.0, aspect], dtype=np.float32)
+    # Eye aspect ratio: (|p2 - p6| + |p3 - p5|) / (2 |p1 - p4|), both eyes at once
+    eyes = points[..., EYES, :2]  # (..., 2, 6, 2)
+    vertical = (np.linalg.norm(eyes[..., 1, :] - eyes[..., 5, :], axis=-1) +
+                np.linalg.norm(eyes[..., 2, :] - eyes[..., 4, :], axis=-1))
+    horizontal = np.linalg.norm(eyes[..., 0, :] - eyes[..., 3, :], axis=-1)
+    ear = (vertical / (2.0 * np.maximum(horizontal, 1e-6))).mean(axis=-1)
+    temples = points[..., RIGHT_TEMPLE, :] - points[..., LEFT_TEMPLE, :]
+    face_width = np.maximum(np.abs(temples[..., 0]), 1e-6)
+    middle = (points[..., RIGHT_TEMPLE, 0] + points[..., LEFT_TEMPLE, 0]) / 2
+    nose_offset = np.abs(points[..., NOSE_TIP, 0] - middle) / face_width
+    # Turning the head moves one temple towards the camera; nodding does the same
+    # to the forehead relative to the chin
+    yaw = np.degrees(np.arctan2(temples[..., 2], np.abs(temples[..., 0])))
+    vertical_axis = points[..., CHIN, :] - points[..., FOREHEAD, :]
+    pitch = np.degrees(np.arctan2(vertical_axis[..., 2], np.abs(vertical_axis[..., 1])))
+    return {'ear': ear, 'nose_offset': nose_offset, 'yaw': yaw, 'pitch': pitch}
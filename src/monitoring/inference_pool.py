@@ -0,0 +1,453 @@
+import os
+import sys
+import time
+import itertools
+import logging
+import subprocess
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client
+from collections import OrderedDict
+from src.auth.face_tracker import FaceTrackers
+from src.utils.frame_context import FrameContext
+from src.utils.shm_ring import SharedFrameRing, RingFrame
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_AUTHKEY_ENV = "EXAMGUARD_WORKER_AUTHKEY"
+
+
+class LocalInference:
+    def __init__(self, profiles, behavior_monitor):
+        """
+        In-process inference service with the same interface as InferencePool.
+        Behaviour analysis runs one call at a time on a background thread, as before;
+        face verification is batched across sessions by the profile's RecognitionBatcher.
+        """
+        self.profiles = profiles
+        self.behavior_monitor = behavior_monitor
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.sessions = {}
+        self.face_trackers = FaceTrackers()
+
+    def open_session(self, session_id, registered_embedding):
+        self.face_trackers.open(session_id)
+        if self.behavior_monitor is not None:
+            old = self.sessions.pop(session_id, None)
+            if old is not None:
+                old.close()
+            self.sessions[session_id] = self.behavior_monitor.for_session(registered_embedding)
+
+    def close_session(self, session_id):
+        self.face_trackers.close(session_id)
+        monitor = self.sessions.pop(session_id, None)
+        if monitor is not None:
+            monitor.close()
+
+    def submit_verify(self, session_id, frame, stored_encoding, tolerance=0.4, stored_normalized=False, profile=None):
+        batcher = self.profiles.batcher(profile)
+        return batcher.submit_verify(frame, stored_encoding, tolerance, stored_normalized,
+                                     self.face_trackers.get(session_id))
+
+    def submit_analyze(self, session_id, frame, run_pose=True, run_yolo=True):
+        monitor = self.sessions.get(session_id)
+        if monitor is None:
+            future = Future()
+            future.set_result(None)
+            return future
+        return self.executor.submit(monitor.analyze_frame, frame, run_pose, run_yolo)
+
+    def prepare_profile(self, level):
+        self.profiles.prepare(level)
+
+    def stats(self):
+        return {
+            "mode": "local",
+            "sessions": len(self.sessions),
+            "profiles": self.profiles.stats(),
+            "face_tracking": self.face_trackers.stats(),
+            "phone_detector": self.behavior_monitor.phone_detector.stats() if self.behavior_monitor is not None else None,
+            "cascade": self.behavior_monitor.cascade_report() if self.behavior_monitor is not None else None,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class _WorkerHandle:
+    def __init__(self, worker_id, process):
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = None
+        self.connected = threading.Event()
+        self.ready = False
+        self.lost = False  # Process or connection gone; a replacement may be starting
+        self.restarts = 0
+        self.failed_starts = 0  # Consecutive deaths without becoming ready, for back-off
+        self.send_lock = threading.Lock()
+        self.pending = {}
+        self.sessions = set()
+
+
+class InferencePool:
+    def __init__(self, num_workers=None, connect_timeout=60):
+        """
+        Pool of inference worker processes, each loading FaceAuthenticator and
+        BehaviorMonitor once. Sessions are pinned to one worker so their MediaPipe
+        tracking state stays in one place; submissions return futures.
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.connect_timeout = connect_timeout
+        self.workers = []
+        self.assignments = {}
+        self.templates = {}  # {session_id: registered embedding}, to reopen moved sessions
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        self.listener = None
+        self.env = None
+        self.closing = False
+
+    def start(self):
+        """Launch the worker processes; models load in the background"""
+        authkey = os.urandom(16)
+        self.listener = Listener(authkey=authkey)
+        self.env = dict(os.environ)
+        self.env[_AUTHKEY_ENV] = authkey.hex()
+        self.env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT_DIR, self.env.get("PYTHONPATH")) if p)
+        for worker_id in range(self.num_workers):
+            self.workers.append(_WorkerHandle(worker_id, self._spawn(worker_id)))
+        accept_thread = threading.Thread(target=self._accept_workers)
+        accept_thread.daemon = True
+        accept_thread.start()
+        return self
+
+    def _spawn(self, worker_id):
+        return subprocess.Popen(
+            [sys.executable, "-m", "src.monitoring.inference_pool", str(self.listener.address), str(worker_id)],
+            cwd=ROOT_DIR,
+            env=self.env
+        )
+
+    def wait_ready(self, timeout=None):
+        """Block until every live worker has loaded its models; returns self"""
+        deadline = None if timeout is None else time.time() + timeout
+        while not all(w.ready or w.process.poll() is not None for w in self.workers):
+            if deadline is not None and time.time() > deadline:
+                break
+            time.sleep(0.2)
+        if not any(w.ready for w in self.workers):
+            raise RuntimeError("No inference worker became ready")
+        return self
+
+    def _accept_workers(self):
+        # Runs for the pool's lifetime: restarted workers connect here too
+        while True:
+            try:
+                conn = self.listener.accept()
+                kind, worker_id = conn.recv()
+            except (OSError, EOFError):
+                if self.closing:
+                    break
+                continue
+            worker = self.workers[worker_id]
+            worker.conn = conn
+            worker.connected.set()
+            reader = threading.Thread(target=self._read_results, args=(worker,))
+            reader.daemon = True
+            reader.start()
+
+    def _read_results(self, worker):
+        while True:
+            try:
+                message = worker.conn.recv()
+                if message[0] == "ready":
+                    worker.ready = True
+                    worker.failed_starts = 0
+                    logging.info(f"Inference worker {worker.worker_id} ready")
+                    # Sessions left here while it restarted (no other worker was up)
+                    # lost their trackers with the old process
+                    with self.lock:
+                        stranded = list(worker.sessions)
+                    for session_id in stranded:
+                        self._submit(worker, "open", session_id, self.templates.get(session_id))
+                    continue
+                request_id, ok, payload = message
+                with self.lock:
+                    future = worker.pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                # e.g. a reply that cannot be unpickled: the stream can no longer be
+                # trusted, so the worker is treated as dead and replaced
+                if not self.closing:
+                    logging.error(f"Inference worker {worker.worker_id} connection failed: {e!r}")
+                try:
+                    worker.conn.close()
+                except Exception:
+                    pass
+                break
+        if self.closing:
+            return
+        logging.error(f"Inference worker {worker.worker_id} exited")
+        worker.ready = False
+        worker.lost = True
+        with self.lock:
+            pending, worker.pending = worker.pending, {}
+            moved, worker.sessions = worker.sessions, set()
+            for session_id in moved:
+                self.assignments.pop(session_id, None)
+        for future in pending.values():
+            future.set_exception(RuntimeError(f"Inference worker {worker.worker_id} exited"))
+        # Its students carry on at the remaining workers (fresh trackers), not unproctored
+        for session_id in moved:
+            self.open_session(session_id, self.templates.get(session_id))
+        self._restart(worker)
+
+    def _restart(self, worker):
+        """Replace a dead worker process, backing off if it keeps dying"""
+        delay = min(60, 2 ** worker.failed_starts)
+        worker.failed_starts += 1
+        worker.restarts += 1
+
+        def restart():
+            time.sleep(delay)
+            if self.closing:
+                return
+            try:
+                worker.process.kill()
+                worker.process.wait(timeout=5)
+            except Exception:
+                pass
+            worker.connected.clear()
+            worker.conn = None
+            worker.process = self._spawn(worker.worker_id)
+            worker.lost = False
+            logging.info(f"Inference worker {worker.worker_id} restarted (pid {worker.process.pid})")
+        thread = threading.Thread(target=restart)
+        thread.daemon = True
+        thread.start()
+
+    def _worker_for(self, session_id):
+        with self.lock:
+            worker = self.assignments.get(session_id)
+            if worker is None:
+                # New sessions go to the live worker currently tracking the fewest students;
+                # ready workers first, so nothing lands on one that is still restarting
+                candidates = ([w for w in self.workers if w.ready] or
+                              [w for w in self.workers if not w.lost] or self.workers)
+                worker = min(candidates, key=lambda w: len(w.sessions))
+                worker.sessions.add(session_id)
+                self.assignments[session_id] = worker
+            return worker
+
+    def _submit(self, worker, kind, session_id, payload):
+        future = Future()
+        request_id = next(self.request_ids)
+        with self.lock:
+            worker.pending[request_id] = future
+        # Only the first start is waited for; a worker being replaced fails fast so
+        # callers (the per-frame loop included) are never held up by a restart
+        timeout = self.connect_timeout if worker.restarts == 0 else 0
+        try:
+            if worker.lost or not worker.connected.wait(timeout):
+                raise RuntimeError(f"Inference worker {worker.worker_id} did not connect")
+            with worker.send_lock:
+                worker.conn.send((kind, request_id, session_id, payload))
+        except Exception as e:
+            with self.lock:
+                owned = worker.pending.pop(request_id, None) is not None
+            # Otherwise a dying worker's reader has already failed it
+            if owned:
+                future.set_exception(e)
+        return future
+
+    def open_session(self, session_id, registered_embedding):
+        self.templates[session_id] = registered_embedding
+        return self._submit(self._worker_for(session_id), "open", session_id, registered_embedding)
+
+    def close_session(self, session_id):
+        self.templates.pop(session_id, None)
+        with self.lock:
+            worker = self.assignments.pop(session_id, None)
+            if worker is not None:
+                worker.sessions.discard(session_id)
+        if worker is not None:
+            return self._submit(worker, "close", session_id, None)
+
+    @staticmethod
+    def _frame_payload(frame):
+        # A frame already in a shared-memory ring is sent as its (ring name, seq)
+        ring_ref = getattr(frame, 'ring_ref', None)
+        return ring_ref if ring_ref is not None else frame
+
+    def submit_verify(self, session_id, frame, stored_encoding, tolerance=0.4, stored_normalized=False, profile=None):
+        return self._submit(self._worker_for(session_id), "verify", session_id,
+                            (self._frame_payload(frame), stored_encoding, tolerance, stored_normalized, profile))
+
+    def submit_analyze(self, session_id, frame, run_pose=True, run_yolo=True):
+        return self._submit(self._worker_for(session_id), "analyze", session_id,
+                            (self._frame_payload(frame), run_pose, run_yolo))
+
+    def prepare_profile(self, level):
+        """Have every worker start loading a profile's models in the background"""
+        for worker in self.workers:
+            self._submit(worker, "prepare", None, level)
+
+    def stats(self, timeout=1.0):
+        # Ask every ready worker for its profile and batching counters in parallel
+        batch_futures = {w.worker_id: self._submit(w, "stats", None, None) for w in self.workers if w.ready}
+        workers = []
+        for w in self.workers:
+            batch_stats = None
+            if w.worker_id in batch_futures:
+                try:
+                    batch_stats = batch_futures[w.worker_id].result(timeout)
+                except Exception:
+                    pass
+            with self.lock:
+                workers.append({
+                    "worker_id": w.worker_id,
+                    "pid": w.process.pid,
+                    "alive": w.process.poll() is None,
+                    "ready": w.ready,
+                    "restarts": w.restarts,
+                    "sessions": len(w.sessions),
+                    "pending": len(w.pending),
+                    "profiles": batch_stats,
+                })
+        return {"mode": "pool", "workers": workers}
+
+    def shutdown(self):
+        self.closing = True
+        for worker in self.workers:
+            if worker.conn is not None:
+                try:
+                    with worker.send_lock:
+                        worker.conn.send(None)
+                except OSError:
+                    pass
+        for worker in self.workers:
+            try:
+                worker.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+        if self.listener is not None:
+            self.listener.close()
+
+
+class _RingReader:
+    def __init__(self, max_rings=32):
+        """
+        Turns RingFrame references back into frames inside a worker. The pixels
+        are copied out of the ring as soon as the request arrives, before the
+        writer can lap the slot; verify and analyze of one frame share a context.
+        """
+        self.max_rings = max_rings
+        self.rings = OrderedDict()  # {ring name: SharedFrameRing}, least recently used first
+        self.last = (None, None)  # (RingFrame, FrameContext) most recently read
+
+    def frame(self, payload):
+        if not isinstance(payload, RingFrame):
+            return payload
+        if self.last[0] == payload:
+            return self.last[1]
+        ring = self.rings.pop(payload.name, None)
+        if ring is None:
+            ring = SharedFrameRing.attach(payload.name)
+            if len(self.rings) >= self.max_rings:
+                # Sessions end without telling us; drop the mapping unused the longest
+                self.rings.popitem(last=False)[1].close()
+        self.rings[payload.name] = ring
+        view = ring.view(payload.seq)
+        frame = view.copy() if view is not None else None
+        if frame is None or not ring.is_valid(payload.seq):
+            raise RuntimeError(f"Frame {payload.seq} was overwritten in ring {payload.name} before it was read")
+        context = FrameContext(frame)
+        self.last = (payload, context)
+        return context
+
+
+def _worker_main(address, worker_id):
+    conn = Client(address, authkey=bytes.fromhex(os.environ[_AUTHKEY_ENV]))
+    conn.send(("hello", worker_id))
+    from src.monitoring.behavior_monitor import BehaviorMonitor
+    from src.monitoring.profiles import ProfileManager
+    # Verification requests from all sessions on this worker are batched together
+    profiles = ProfileManager()
+    # The microphone belongs to the web process; workers only see frames
+    base_monitor = BehaviorMonitor(None, enable_audio=False)
+    profiles.warm_up()
+    base_monitor.warm_up()
+    sessions = {}
+    face_trackers = FaceTrackers()
+    ring_reader = _RingReader()
+    send_lock = threading.Lock()
+
+    def reply(message):
+        with send_lock:
+            conn.send(message)
+
+    def reply_when_done(request_id, future):
+        def done(f):
+            try:
+                reply((request_id, True, f.result()))
+            except Exception:
+                reply((request_id, False, traceback.format_exc()))
+        future.add_done_callback(done)
+
+    reply(("ready", worker_id))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        kind, request_id, session_id, payload = message
+        try:
+            if kind == "verify":
+                frame, stored_encoding, tolerance, stored_normalized, profile = payload
+                frame = ring_reader.frame(frame)
+                batcher = profiles.batcher(profile)
+                reply_when_done(request_id, batcher.submit_verify(frame, stored_encoding, tolerance, stored_normalized,
+                                                                  face_trackers.get(session_id)))
+                continue
+            if kind == "open":
+                face_trackers.open(session_id)
+                old = sessions.pop(session_id, None)
+                if old is not None:
+                    old.close()
+                sessions[session_id] = base_monitor.for_session(payload)
+                result = True
+            elif kind == "close":
+                face_trackers.close(session_id)
+                monitor = sessions.pop(session_id, None)
+                if monitor is not None:
+                    monitor.close()
+                result = True
+            elif kind == "analyze":
+                monitor = sessions.get(session_id)
+                frame, run_pose, run_yolo = payload
+                result = monitor.analyze_frame(ring_reader.frame(frame), run_pose, run_yolo) if monitor is not None else None
+            elif kind == "prepare":
+                profiles.prepare(payload)
+                result = True
+            elif kind == "stats":
+                result = dict(profiles.stats(), face_tracking=face_trackers.stats(),
+                              cascade=base_monitor.cascade_report())
+            else:
+                raise ValueError(f"Unknown request kind: {kind}")
+            reply((request_id, True, result))
+        except Exception:
+            reply((request_id, False, traceback.format_exc()))
+    conn.close()
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from performance_config import PERFORMANCE_THRESHOLDS, PROCESSING_INTERVALS, OPTIMIZATIONS
+
+try:
+    import psutil
+except ImportError:
+    psutil = None  # Fall back to /proc and the load average
+
+# Each step keeps everything the previous one shed. Face verification is never
+# dropped; YOLO goes first, then the pose tracker, then checks are spaced further.
+DEGRADATION_LEVELS = [
+    {'name': 'normal', 'interval_scale': 1.0, 'frame_scale': 1, 'run_yolo': True, 'run_pose': True},
+    {'name': 'widened', 'interval_scale': 1.5, 'frame_scale': 2, 'run_yolo': True, 'run_pose': True},
+    {'name': 'no_yolo', 'interval_scale': 1.5, 'frame_scale': 2, 'run_yolo': False, 'run_pose': True},
+    {'name': 'no_pose', 'interval_scale': 2.0, 'frame_scale': 3, 'run_yolo': False, 'run_pose': False},
+    {'name': 'minimal', 'interval_scale': 3.0, 'frame_scale': 4, 'run_yolo': False, 'run_pose': False},
+]
+
+
+def _cpu_percent():
+    if psutil is not None:
+        return psutil.cpu_percent(interval=None)
+    # 1-minute load average as a share of the available cores
+    return min(100.0, os.getloadavg()[0] / (os.cpu_count() or 1) * 100)
+
+
+def _memory_percent():
+    if psutil is not None:
+        return psutil.virtual_memory().percent
+    info = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            info[key] = int(value.split()[0])
+    return 100.0 * (1 - info['MemAvailable'] / info['MemTotal'])
+
+
+class LoadController:
+    def __init__(self, thresholds=PERFORMANCE_THRESHOLDS, interval=PROCESSING_INTERVALS['system_monitor'],
+                 enabled=OPTIMIZATIONS['enable_dynamic_adjustment'], calm_samples=2, history_size=200):
+        """
+        Samples CPU, memory and per-stage check latency every `interval` seconds and
+        moves proctoring up or down DEGRADATION_LEVELS. Critical load sheds one more
+        step per sample; settings are restored one step at a time once load has stayed
+        below the warning thresholds for `calm_samples` samples.
+        """
+        self.thresholds = thresholds
+        self.interval = interval
+        self.enabled = enabled
+        self.calm_samples = calm_samples
+        self.lock = threading.Lock()
+        self.level = 0
+        self.calm = 0
+        self.cpu = 0.0
+        self.memory = 0.0
+        self.lag = {}  # {stage: smoothed seconds from submit to result}
+        self.lag_at = {}  # {stage: time of its latest measurement}
+        self.history = deque(maxlen=history_size)
+        self.thread = None
+
+    def start(self):
+        if not self.enabled or self.thread is not None:
+            return self
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def record_lag(self, stage, seconds):
+        """Feed one measured latency for a pipeline stage (e.g. 'verify', 'analyze')"""
+        with self.lock:
+            previous = self.lag.get(stage)
+            self.lag[stage] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+            self.lag_at[stage] = time.time()
+
+    def _run(self):
+        if psutil is not None:
+            psutil.cpu_percent(interval=None)  # First call only primes the counter
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample(_cpu_percent(), _memory_percent())
+            except Exception as e:
+                logging.error(f"Load sampling failed: {e}")
+
+    def sample(self, cpu, memory):
+        """Apply one CPU/memory reading and adjust the degradation level"""
+        t = self.thresholds
+        with self.lock:
+            self.cpu, self.memory = cpu, memory
+            # A stage with no checks finishing for two samples (an idle node) says
+            # nothing about the pipeline now; its next measurement starts afresh
+            now = time.time()
+            for stage in [stage for stage, at in self.lag_at.items() if now - at > 2 * self.interval]:
+                self.lag.pop(stage, None)
+                self.lag_at.pop(stage, None)
+            # Checks that take longer than the base interval mean the pipeline is falling behind
+            lagging = sorted(stage for stage, lag in self.lag.items()
+                             if lag > PROCESSING_INTERVALS['behavior_check'])
+            if cpu >= t['cpu_critical'] or memory >= t['memory_critical']:
+                pressure, level, self.calm = 'critical', min(self.level + 1, len(DEGRADATION_LEVELS) - 1), 0
+            elif cpu >= t['cpu_warning'] or memory >= t['memory_warning'] or lagging:
+                pressure, level, self.calm = 'warning', max(self.level, 1), 0
+            else:
+                pressure, level = 'normal', self.level
+                self.calm += 1
+                if self.level > 0 and self.calm >= self.calm_samples:
+                    level, self.calm = self.level - 1, 0
+            if level == self.level:
+                return
+            previous, self.level = self.level, level
+            entry = {
+                'time': time.time(),
+                'from': DEGRADATION_LEVELS[previous]['name'],
+                'to': DEGRADATION_LEVELS[level]['name'],
+                'pressure': pressure,
+                'cpu': round(cpu, 1),
+                'memory': round(memory, 1),
+                'lagging_stages': lagging,
+            }
+            self.history.append(entry)
+        log = logging.warning if level > previous else logging.info
+        log(f"Proctoring load level {entry['from']} -> {entry['to']} "
+            f"(cpu {entry['cpu']}%, memory {entry['memory']}%, lagging {lagging or 'none'})")
+
+    def adjust(self, settings):
+        """Scale a profile_settings() dict for the current load and add run_yolo/run_pose"""
+        with self.lock:
+            step = DEGRADATION_LEVELS[self.level]
+        adjusted = dict(settings)
+        adjusted['check_interval'] = settings['check_interval'] * step['interval_scale']
+        adjusted['heavy_check_every_n_frames'] = settings['heavy_check_every_n_frames'] * step['frame_scale']
+        adjusted['run_yolo'] = step['run_yolo']
+        adjusted['run_pose'] = step['run_pose']
+        adjusted['load_level'] = step['name']
+        return adjusted
+
+    def stats(self):
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'level': DEGRADATION_LEVELS[self.level]['name'],
+                'cpu': self.cpu,
+                'memory': self.memory,
+                'stage_lag_ms': {stage: round(lag * 1000, 1) for stage, lag in self.lag.items()},
+                'adjustments': list(self.history)[-20:],
+            }
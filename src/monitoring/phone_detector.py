@@ -0,0 +1,79 @@
+import time
+import logging
+import threading
+
+
+class AsyncPhoneDetector:
+    def __init__(self, detect):
+        """
+        Runs detect(frame, rois) -> bool on its own thread, off the analysis path.
+        Each session keeps only its newest submitted frame; older ones are replaced,
+        so detection always looks at the latest view and runs as often as the CPU
+        allows. One thread serves every session, since the YOLO predictor must not
+        be called concurrently.
+        """
+        self.detect = detect
+        self.cond = threading.Condition()
+        self.waiting = {}  # {session key: (newest frame not yet checked, its regions of interest, submitted at)}
+        self.results = {}  # {session key: (phone detected, time that frame was submitted)}
+        self.active = set()
+        self.runs = 0
+        self.replaced = 0
+        self.total_time = 0.0
+        self.thread = threading.Thread(target=self._run, name="phone-detector")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, key, frame, rois=None):
+        """Queue a frame; rois are (x1, y1, x2, y2) regions to check instead of the whole frame"""
+        with self.cond:
+            if key in self.waiting:
+                self.replaced += 1
+            else:
+                self.cond.notify()
+            self.waiting[key] = (frame, rois, time.time())
+            self.active.add(key)
+
+    def latest(self, key):
+        """
+        (phone detected, frame submitted at) for the session's last finished check,
+        or None. It stays until a newer check replaces it.
+        """
+        with self.cond:
+            return self.results.get(key)
+
+    def forget(self, key):
+        with self.cond:
+            self.waiting.pop(key, None)
+            self.results.pop(key, None)
+            self.active.discard(key)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.waiting:
+                    self.cond.wait()
+                # Oldest waiting session first, so busy sessions cannot starve others
+                key = next(iter(self.waiting))
+                frame, rois, submitted_at = self.waiting.pop(key)
+            started = time.time()
+            try:
+                detected = self.detect(frame, rois)
+            except Exception as e:
+                logging.error(f"Phone detection failed: {e}")
+                continue
+            finished = time.time()
+            with self.cond:
+                if key in self.active:  # not closed while we were running
+                    self.results[key] = (detected, submitted_at)
+                self.runs += 1
+                self.total_time += finished - started
+
+    def stats(self):
+        with self.cond:
+            return {
+                'runs': self.runs,
+                'replaced_frames': self.replaced,
+                'waiting': len(self.waiting),
+                'mean_ms': round(self.total_time / self.runs * 1000, 1) if self.runs else 0.0,
+            }
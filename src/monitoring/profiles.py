@@ -0,0 +1,118 @@
+import time
+import logging
+import threading
+from accuracy_config import ACCURACY_LEVELS, CURRENT_ACCURACY_LEVEL, get_accuracy_settings
+from performance_config import PROCESSING_INTERVALS
+from src.auth.face_auth import FaceAuthenticator
+from src.auth.recognition_batcher import RecognitionBatcher, batch_settings_from_env
+
+# Templates are enrolled with this model, so verification must keep using its
+# recognition network whatever detector a profile picks
+RECOGNITION_MODEL = 'buffalo_l'
+
+
+def profile_settings(level):
+    """
+    Runtime settings for an accuracy level from accuracy_config.ACCURACY_LEVELS,
+    combined with the check interval from performance_config.
+    """
+    if level not in ACCURACY_LEVELS:
+        level = CURRENT_ACCURACY_LEVEL
+    accuracy = get_accuracy_settings(level)
+    return {
+        'level': level,
+        'detector_model': accuracy['face_model'],
+        'detection_size': tuple(accuracy['detection_size']),
+        'det_thresh': accuracy['confidence_threshold'],
+        'heavy_check_every_n_frames': accuracy['frame_skip'],
+        'check_interval': PROCESSING_INTERVALS['behavior_check'],
+    }
+
+
+def face_auth_for(level):
+    """FaceAuthenticator configured for an accuracy level (models come from the shared registry)"""
+    settings = profile_settings(level)
+    return FaceAuthenticator(
+        model_name=RECOGNITION_MODEL,
+        det_size=settings['detection_size'],
+        detector_model=settings['detector_model'],
+        det_thresh=settings['det_thresh']
+    )
+
+
+class ProfileManager:
+    def __init__(self, default_level=CURRENT_ACCURACY_LEVEL):
+        """
+        Keeps one face verification stack (FaceAuthenticator behind a RecognitionBatcher)
+        per accuracy profile in use. Profiles that are not loaded yet are built on a
+        background thread; until then callers get the default profile's stack, so
+        switching never blocks or interrupts a running session.
+        """
+        self.default_level = profile_settings(default_level)['level']
+        self.lock = threading.Lock()
+        self.batchers = {}
+        self.loading = set()
+        self.load_times = {}
+        self.batchers[self.default_level] = self._build(self.default_level)
+
+    def warm_up(self):
+        """Exercise the default profile's models once"""
+        self.batcher().face_auth.warm_up()
+
+    def _build(self, level):
+        started = time.time()
+        face_auth = face_auth_for(level)
+        self.load_times[level] = round(time.time() - started, 2)
+        return RecognitionBatcher(face_auth, **batch_settings_from_env())
+
+    def _load_in_background(self, level, make_default=False):
+        def load():
+            try:
+                batcher = self._build(level)
+            except Exception as e:
+                logging.error(f"Loading accuracy profile '{level}' failed: {e}")
+                with self.lock:
+                    self.loading.discard(level)
+                return
+            with self.lock:
+                self.batchers[level] = batcher
+                self.loading.discard(level)
+                if make_default:
+                    self.default_level = level
+            logging.info(f"Accuracy profile '{level}' ready")
+        thread = threading.Thread(target=load)
+        thread.daemon = True
+        thread.start()
+
+    def prepare(self, level, make_default=False):
+        """Start loading a profile's models if they are not loaded yet"""
+        level = profile_settings(level)['level']
+        with self.lock:
+            if level in self.batchers:
+                if make_default:
+                    self.default_level = level
+                return
+            if level in self.loading:
+                return
+            self.loading.add(level)
+        self._load_in_background(level, make_default)
+
+    def batcher(self, level=None):
+        """Verification batcher for a profile, falling back to the default while it loads"""
+        level = self.default_level if level is None else profile_settings(level)['level']
+        with self.lock:
+            batcher = self.batchers.get(level)
+            if batcher is not None:
+                return batcher
+            fallback = self.batchers[self.default_level]
+        self.prepare(level)
+        return fallback
+
+    def stats(self):
+        with self.lock:
+            return {
+                'default': self.default_level,
+                'loaded': {level: b.stats() for level, b in self.batchers.items()},
+                'loading': sorted(self.loading),
+                'load_seconds': dict(self.load_times),
+            }
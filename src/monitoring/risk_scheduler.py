@@ -0,0 +1,99 @@
+import time
+import threading
+from performance_config import RISK_SCHEDULING
+
+
+class RiskScheduler:
+    def __init__(self, budget=RISK_SCHEDULING['node_checks_per_second'],
+                 alert_window=RISK_SCHEDULING['alert_window'],
+                 clean_after=RISK_SCHEDULING['clean_after'],
+                 hot_scale=RISK_SCHEDULING['hot_interval_scale'],
+                 clean_scale=RISK_SCHEDULING['clean_interval_scale']):
+        """
+        Spreads heavy checks across sessions by integrity risk. A session is 'hot'
+        for alert_window seconds after any violation or screen event (checks every
+        base interval * hot_scale), 'clean' once it has gone clean_after seconds
+        without one (base * clean_scale), and 'normal' otherwise. If the sessions'
+        combined rate exceeds the node budget (checks per second), every session is
+        slowed by the same factor, so hot sessions keep their larger share.
+        """
+        self.budget = budget
+        self.alert_window = alert_window
+        self.clean_after = clean_after
+        self.hot_scale = hot_scale
+        self.clean_scale = clean_scale
+        self.lock = threading.Lock()
+        self.sessions = {}  # {user: {'started', 'last_event', 'base_interval', 'rate'}}
+        # Sum of every session's 'rate' (checks per second it wants), kept up to date as
+        # each session is adjusted so no call has to walk all sessions. A session's
+        # share is refreshed on its own next adjust(), i.e. within one of its frames.
+        self.demand = 0.0
+
+    def open(self, user):
+        with self.lock:
+            self._drop(user)
+            self.sessions[user] = {'started': time.time(), 'last_event': None, 'base_interval': None, 'rate': 0.0}
+
+    def close(self, user):
+        with self.lock:
+            self._drop(user)
+
+    def _drop(self, user):
+        state = self.sessions.pop(user, None)
+        if state is not None:
+            self.demand -= state['rate']
+        if not self.sessions:
+            self.demand = 0.0  # No float drift carried into the next exam
+
+    def record_event(self, user, event):
+        with self.lock:
+            state = self.sessions.get(user)
+            if state is not None:
+                state['last_event'] = time.time()
+
+    def _level(self, state, now):
+        if state['last_event'] is not None and now - state['last_event'] < self.alert_window:
+            return 'hot'
+        quiet_since = state['last_event'] or state['started']
+        if now - quiet_since >= self.clean_after:
+            return 'clean'
+        return 'normal'
+
+    def _scale(self, level):
+        return {'hot': self.hot_scale, 'clean': self.clean_scale}.get(level, 1.0)
+
+    def adjust(self, user, settings):
+        """Rescale check_interval and heavy_check_every_n_frames for this session's risk"""
+        now = time.time()
+        base = settings['check_interval']
+        with self.lock:
+            state = self.sessions.get(user)
+            if state is None:
+                return dict(settings, risk='unscheduled')
+            state['base_interval'] = base
+            level = self._level(state, now)
+            # Interval this session would like, and the rate all sessions want together
+            wanted = base * self._scale(level)
+            self.demand += 1.0 / wanted - state['rate']
+            state['rate'] = 1.0 / wanted
+            demand = self.demand
+        interval = wanted
+        if self.budget and demand > self.budget:
+            interval = wanted * demand / self.budget
+        adjusted = dict(settings)
+        adjusted['check_interval'] = interval
+        adjusted['heavy_check_every_n_frames'] = max(1, int(round(
+            settings['heavy_check_every_n_frames'] * interval / base)))
+        adjusted['risk'] = level
+        return adjusted
+
+    def stats(self):
+        now = time.time()
+        with self.lock:
+            levels = {user: self._level(state, now) for user, state in self.sessions.items()}
+            demand = self.demand
+        return {
+            'budget_checks_per_second': self.budget,
+            'demand_checks_per_second': round(demand, 2),
+            'sessions': levels,
+        }
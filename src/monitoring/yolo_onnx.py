@@ -0,0 +1,154 @@
+"""
+YOLOv8 object detection on ONNX Runtime with NumPy pre/post-processing, so the
+proctoring runtime never imports torch or ultralytics.
+
+Export the model once (needs requirements-export.txt):
+
+    python -m src.monitoring.yolo_onnx export yolov8n.pt
+"""
+import os
+import sys
+import cv2
+import numpy as np
+
+CELL_PHONE = 67  # COCO class id
+
+
+def default_phone_model():
+    """EXAMGUARD_PHONE_MODEL, else the exported ONNX model if present, else the .pt weights"""
+    model = os.environ.get("EXAMGUARD_PHONE_MODEL")
+    if model:
+        return model
+    return 'yolov8n.onnx' if os.path.exists('yolov8n.onnx') else 'yolov8n.pt'
+
+
+def letterbox(image, size=640, color=(114, 114, 114)):
+    """
+    Resize keeping the aspect ratio and pad to size x size, as ultralytics does.
+    Returns the padded image, the scale and the (x, y) padding.
+    """
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, scale, (left, top)
+
+
+def nms(boxes, scores, iou_threshold=0.45):
+    """Greedy non-maximum suppression over (N, 4) x1, y1, x2, y2 boxes; returns kept indices"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.maximum(0.0, xx2 - xx1) * np.maximum(0.0, yy2 - yy1)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class YoloOnnxDetector:
+    def __init__(self, model_path='yolov8n.onnx', input_size=640, conf_threshold=0.25,
+                 iou_threshold=0.45, session_options=None, providers=('CPUExecutionProvider',)):
+        """
+        YOLOv8 detector exported to ONNX (output shape 1 x (4 + classes) x anchors).
+        """
+        import onnxruntime
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=session_options,
+                                                    providers=list(providers))
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Exported with dynamic=True the model takes any batch and any multiple of 32
+        self.dynamic = not all(isinstance(dim, int) for dim in model_input.shape)
+        self.input_size = input_size if self.dynamic else model_input.shape[2]
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+    def preprocess(self, frame, size=None):
+        image, scale, pad = letterbox(frame, size or self.input_size)
+        blob = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[np.newaxis]
+        return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, scale, pad
+
+    def decode(self, output, scale, pad, frame_shape, classes=None):
+        """Raw model output -> (N, 6) array of x1, y1, x2, y2, score, class in frame coordinates"""
+        predictions = output[0].T  # (anchors, 4 + classes)
+        class_scores = predictions[:, 4:]
+        if classes is not None:
+            class_ids = np.asarray(classes)
+            class_scores = class_scores[:, class_ids]
+        else:
+            class_ids = np.arange(class_scores.shape[1])
+        best = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(best)), best]
+        mask = scores > self.conf_threshold
+        if not mask.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        cx, cy, w, h = predictions[mask, :4].T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        # Undo the letterbox and clip to the frame
+        boxes -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+        boxes /= scale
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_shape[0])
+        scores, labels = scores[mask], class_ids[best[mask]]
+        detections = []
+        # Class-aware NMS, like ultralytics' default
+        for label in np.unique(labels):
+            idx = np.where(labels == label)[0]
+            for i in idx[nms(boxes[idx], scores[idx], self.iou_threshold)]:
+                detections.append([*boxes[i], scores[i], label])
+        return np.array(detections, dtype=np.float32)
+
+    def detect(self, frame, classes=None):
+        """Detections in a BGR frame, optionally only for the given COCO class ids"""
+        blob, scale, pad = self.preprocess(frame)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return self.decode(output, scale, pad, frame.shape, classes)
+
+    def detect_batch(self, images, classes=None, size=None):
+        """
+        Detections for several images (e.g. crops) letterboxed to `size`, in one run
+        when the model has dynamic axes; a static model runs them one by one at its
+        export size.
+        """
+        if not self.dynamic:
+            return [self.detect(image, classes) for image in images]
+        prepared = [self.preprocess(image, size) for image in images]
+        blob = np.concatenate([blob for blob, _, _ in prepared])
+        outputs = self.session.run(None, {self.input_name: blob})[0]
+        return [self.decode(outputs[i:i + 1], scale, pad, image.shape, classes)
+                for i, (image, (_, scale, pad)) in enumerate(zip(images, prepared))]
+
+    def contains(self, frame, class_id, min_confidence):
+        detections = self.detect(frame, classes=[class_id])
+        return bool((detections[:, 4] > min_confidence).any())
+
+    def contains_any(self, images, class_id, min_confidence, size=None):
+        """True if any of the images shows class_id"""
+        return any(bool((detections[:, 4] > min_confidence).any())
+                   for detections in self.detect_batch(images, [class_id], size))
+
+
+def export(weights='yolov8n.pt', imgsz=640):
+    """One-off export of ultralytics weights to ONNX; the only place ultralytics is used"""
+    from ultralytics import YOLO
+    # Dynamic axes let hand crops run batched at a small input size
+    return YOLO(weights).export(format='onnx', imgsz=imgsz, opset=12, dynamic=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'export':
+        print("usage: python -m src.monitoring.yolo_onnx export [weights.pt]")
+        sys.exit(1)
+    print(export(sys.argv[2] if len(sys.argv) > 2 else 'yolov8n.pt'))
@@ -1,22 +1,97 @@
 import cv2
 import numpy as np
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition
 import time
+from src.utils.shm_ring import SharedFrameRing, RingFrame
+from src.utils.image_utils import jpeg_size
 
-class Camera:
-    def __init__(self, src=0, width=640, height=480):
+class FrameSource:
+    def __init__(self):
         """
-        Initialize the camera with CPU-optimized settings
+        Latest-frame slot shared by all frame producers.
+        Every published frame gets a monotonically increasing sequence number and
+        wakes up consumers blocked in wait_for_frame().
         """
+        self.lock = Lock()
+        self.cond = Condition(self.lock)
+        self.frame = None
+        self.seq = 0
+        self.ring = None
+        self.ring_offset = 0  # frames published before the ring existed
+
+    def enable_shared_ring(self, shape, slots=4, name=None):
+        """
+        Also publish every frame into a shared-memory ring so analysis processes
+        can map frames zero-copy with SharedFrameRing.attach(self.ring.name).
+        """
+        if self.ring is None:
+            with self.lock:
+                self.ring_offset = self.seq
+            self.ring = SharedFrameRing(name=name, slots=slots, shape=shape)
+        return self.ring.name
+
+    def ring_ref(self, seq, frame):
+        """
+        RingFrame by which another process can read frame seq from the shared ring,
+        or None without a ring or if the ring holds a resized copy
+        """
+        ring = self.ring
+        if ring is None or frame.shape != ring.shape or seq <= self.ring_offset:
+            return None
+        return RingFrame(ring.name, seq - self.ring_offset)
+
+    def _publish(self, frame):
+        # Consumers receive this exact array, so freeze it instead of copying
+        frame.flags.writeable = False
+        if self.ring is not None:
+            ring_frame = frame
+            if frame.shape != self.ring.shape:
+                height, width = self.ring.shape[:2]
+                ring_frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            self.ring.write(ring_frame)
+        with self.cond:
+            self.frame = frame
+            self.seq += 1
+            self.cond.notify_all()
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """
+        Block until a frame newer than after_seq is published.
+        Returns (seq, frame) where frame is a read-only view, or (after_seq, None) on timeout.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > after_seq and self.frame is not None, timeout):
+                return after_seq, None
+            return self.seq, self.frame
+
+    def get_frame(self):
+        """Return a writable copy of the current frame"""
+        with self.lock:
+            if self.frame is None:
+                return None
+            return self.frame.copy()
+
+    def _close_ring(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+class Camera(FrameSource):
+    def __init__(self, src=0, width=640, height=480, fps=30, shared_ring_slots=0):
+        """
+        Initialize the camera with CPU-optimized settings.
+        With shared_ring_slots > 0 frames are also written to a shared-memory ring.
+        """
+        super().__init__()
+        if shared_ring_slots:
+            self.enable_shared_ring((height, width, 3), slots=shared_ring_slots)
         self.stream = cv2.VideoCapture(src)
         self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, width)
         self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-        self.stream.set(cv2.CAP_PROP_FPS, 30)
+        self.stream.set(cv2.CAP_PROP_FPS, fps)
         
-        # Initialize thread and lock
+        # Initialize thread
         self.thread = None
-        self.lock = Lock()
-        self.frame = None
         self.stopped = False
         
         # Start frame grabbing thread
@@ -35,25 +110,88 @@ class Camera:
             if self.stopped:
                 return
             
+            # read() blocks until the device delivers the next frame
             ret, frame = self.stream.read()
             if ret:
-                with self.lock:
-                    self.frame = frame
-            time.sleep(0.01)  # Short sleep to prevent CPU overload
-    
-    def get_frame(self):
-        """Return the current frame"""
-        with self.lock:
-            if self.frame is None:
-                return None
-            return self.frame.copy()
+                self._publish(frame)
+            else:
+                time.sleep(0.05)  # Device not ready; avoid a tight retry loop
     
     def release(self):
         """Stop the thread and release the camera"""
         self.stopped = True
         if self.thread is not None:
             self.thread.join()
-        self.stream.release() 
+        self.stream.release()
+        self._close_ring()
+
+class RemoteCamera(FrameSource):
+    def __init__(self, width=320, height=240, fps=10):
+        """
+        Per-session frame source fed by JPEG frames uploaded from the student's browser.
+        Exposes the same interface as Camera so process_frame can use either.
+        """
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.last_frame_time = 0
+        self.frames_received = 0
+        self.frames_rejected = 0
+        self.frames_throttled = 0
+        self.rate_slack = 0.9  # Minimum gap between frames as a share of 1/fps, for browser timer jitter
+
+    # JPEG decoders scale by 1/2, 1/4 or 1/8 while decoding, largest reduction first
+    REDUCED_READS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                     (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+    def too_soon(self, now=None):
+        """True if a frame now would exceed the negotiated fps"""
+        now = time.time() if now is None else now
+        return now - self.last_frame_time < self.rate_slack / max(1, self.fps)
+
+    def _read_flag(self, data):
+        # Oversized uploads are decoded at the smallest reduction still covering
+        # the negotiated size instead of at full resolution
+        size = jpeg_size(data)
+        if size is not None:
+            for factor, flag in self.REDUCED_READS:
+                if size[0] // factor >= self.width and size[1] // factor >= self.height:
+                    return flag
+        return cv2.IMREAD_COLOR
+
+    def push_jpeg(self, data):
+        """
+        Decode a JPEG payload straight into the latest-frame slot.
+        Returns True if published, False for an undecodable frame and None for a
+        frame dropped, undecoded, because it came sooner than the negotiated fps allows.
+        """
+        if self.too_soon():
+            self.frames_throttled += 1
+            return None
+        buf = np.frombuffer(data, dtype=np.uint8)
+        frame = cv2.imdecode(buf, self._read_flag(data)) if buf.size else None
+        if frame is None:
+            self.frames_rejected += 1
+            return False
+        h, w = frame.shape[:2]
+        # Clients that ignore the negotiated size are scaled down here
+        if w > self.width or h > self.height:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        self.last_frame_time = time.time()
+        self.frames_received += 1
+        self._publish(frame)
+        return True
+
+    def settings(self):
+        """Capture settings the client is asked to use"""
+        return {"width": self.width, "height": self.height, "fps": self.fps}
+
+    def release(self):
+        """Drop the last frame; there is no device to close"""
+        with self.lock:
+            self.frame = None
+        self._close_ring()
 
 def generate_frames():
     last_empty = False
@@ -90,4 +228,4 @@ def process_frame():
                 print("No frame to process")
                 time.sleep(0.05)  # Prevents tight loop if camera is not ready
         else:
-            time.sleep(0.05) 
\ No newline at end of file
+            time.sleep(0.05)
@@ -1,6 +1,5 @@
 import sqlite3
 from werkzeug.security import generate_password_hash, check_password_hash
-from src.auth.face_auth import FaceAuthenticator
 
 DB_PATH = 'proctoring.db'
 
@@ -70,4 +69,28 @@ def get_face_embedding(username):
     conn.close()
     if row and row[0] is not None:
         return row[0]
-    return None
\ No newline at end of file
+    return None
+
+def get_face_embeddings_since(last_id=0):
+    """
+    Retrieve (id, username, face embedding BLOB) for every user with a registered
+    face whose id is above last_id, in id order.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('SELECT id, username, face_embedding FROM users WHERE id > ? AND face_embedding IS NOT NULL ORDER BY id',
+              (last_id,))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def face_embedding_exists(user_id):
+    """
+    True if the user with this id still exists and has a registered face.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('SELECT 1 FROM users WHERE id = ? AND face_embedding IS NOT NULL', (user_id,))
+    row = c.fetchone()
+    conn.close()
+    return row is not None
@@ -0,0 +1,66 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.utils.db import get_face_embedding
+
+
+class EmbeddingCache:
+    def __init__(self, max_size=1024, ttl_seconds=300, loader=get_face_embedding):
+        """
+        Bounded LRU of registered face templates, keyed by username.
+        Templates are decoded from the DB BLOB once and stored as read-only,
+        unit-norm float32 vectors, so verification is a single dot product.
+        """
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # {username: (template, expires_at)}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def to_template(embedding):
+        """Decode (if needed) and L2-normalise an embedding"""
+        if isinstance(embedding, (bytes, bytearray, memoryview)):
+            embedding = np.frombuffer(embedding, dtype=np.float32)
+        template = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(template)
+        if norm == 0:
+            return None
+        template = template / norm
+        template.flags.writeable = False
+        return template
+
+    def get(self, username):
+        """Return the user's template, loading it from the DB on a miss"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(username)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(username)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        template = None
+        blob = self.loader(username)
+        if blob is not None:
+            template = self.to_template(blob)
+        if template is not None:
+            with self.lock:
+                self.entries[username] = (template, now + self.ttl)
+                self.entries.move_to_end(username)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        return template
+
+    def invalidate(self, username):
+        """Forget a user's template, e.g. after re-registration"""
+        with self.lock:
+            self.entries.pop(username, None)
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "max_size": self.max_size,
+                    "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,132 @@
+import threading
+import numpy as np
+from src.utils.db import get_face_embeddings_since, face_embedding_exists
+
+
+class EmbeddingIndex:
+    def __init__(self, dim=512, initial_capacity=1024):
+        """
+        In-memory 1:N face index.
+        All enrolled embeddings live L2-normalised in one float32 matrix, so a
+        top-k cosine query is a single matrix-vector product.
+        """
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self.count = 0
+        self.usernames = []
+        self.rows = {}  # {username: row in matrix}
+        self.user_ids = {}  # {username: users.id}, for rows read from the database
+        self.synced_id = 0  # Highest users.id read from the database so far
+
+    @classmethod
+    def from_db(cls, dim=512):
+        """Build the index from every users.face_embedding BLOB"""
+        rows = get_face_embeddings_since(0)
+        index = cls(dim=dim, initial_capacity=max(1024, 2 * len(rows)))
+        index._load(rows)
+        return index
+
+    def _load(self, rows):
+        for user_id, username, blob in rows:
+            if self.add(username, np.frombuffer(blob, dtype=np.float32)):
+                self.user_ids[username] = user_id
+            self.synced_id = max(self.synced_id, user_id)
+
+    def sync_from_db(self):
+        """
+        Add users enrolled since the last sync, e.g. by other web worker
+        processes. Only rows above the highest id already read are fetched.
+        """
+        self._load(get_face_embeddings_since(self.synced_id))
+
+    def rebuild_from_db(self):
+        """Re-read every enrolment, dropping users deleted from the database"""
+        rows = get_face_embeddings_since(0)
+        with self.lock:
+            self.count = 0
+            self.usernames = []
+            self.rows = {}
+            self.user_ids = {}
+            self.synced_id = 0
+        self._load(rows)
+
+    def search_enrolled(self, embedding, k=5, exclude=None):
+        """
+        search() against the users table as it is now: new enrolments are synced
+        first, and a match whose user has since been deleted triggers a rebuild.
+        """
+        self.sync_from_db()
+        matches = self.search(embedding, k=k, exclude=exclude)
+        with self.lock:
+            user_ids = [self.user_ids.get(username) for username, _ in matches]
+        if any(user_id is not None and not face_embedding_exists(user_id) for user_id in user_ids):
+            self.rebuild_from_db()
+            matches = self.search(embedding, k=k, exclude=exclude)
+        return matches
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def add(self, username, embedding):
+        """Insert or replace one user's embedding"""
+        vector = self._normalize(embedding)
+        if vector is None or vector.shape[0] != self.dim:
+            return False
+        with self.lock:
+            row = self.rows.get(username)
+            if row is None:
+                if self.count == self.matrix.shape[0]:
+                    grown = np.zeros((2 * self.matrix.shape[0], self.dim), dtype=np.float32)
+                    grown[:self.count] = self.matrix[:self.count]
+                    self.matrix = grown
+                row = self.count
+                self.count += 1
+                self.usernames.append(username)
+                self.rows[username] = row
+            self.matrix[row] = vector
+        return True
+
+    def remove(self, username):
+        """Drop a user, moving the last row into the freed slot"""
+        with self.lock:
+            row = self.rows.pop(username, None)
+            if row is None:
+                return False
+            self.user_ids.pop(username, None)
+            last = self.count - 1
+            if row != last:
+                moved = self.usernames[last]
+                self.matrix[row] = self.matrix[last]
+                self.usernames[row] = moved
+                self.rows[moved] = row
+            self.usernames.pop()
+            self.count -= 1
+        return True
+
+    def search(self, embedding, k=5, exclude=None):
+        """
+        Return up to k (username, cosine similarity) pairs, most similar first.
+        """
+        query = self._normalize(embedding)
+        if query is None or query.shape[0] != self.dim:
+            return []
+        with self.lock:
+            if self.count == 0:
+                return []
+            similarities = self.matrix[:self.count] @ query
+            usernames = list(self.usernames)
+            if exclude in self.rows:
+                similarities[self.rows[exclude]] = -np.inf
+        k = min(k, similarities.shape[0])
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(usernames[i], float(similarities[i])) for i in top if np.isfinite(similarities[i])]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,62 @@
+from collections import deque
+from threading import Condition
+
+
+class FrameChannel:
+    def __init__(self, maxlen=2):
+        """
+        Bounded per-session frame channel that keeps only the newest frames.
+        When full, the oldest frame is evicted so readers never fall behind.
+        """
+        self.frames = deque(maxlen=maxlen)
+        self.cond = Condition()
+        self.put_count = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame):
+        """Add a frame, evicting the oldest one if the channel is full"""
+        with self.cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self.put_count += 1
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest buffered frame, or None on timeout or close"""
+        with self.cond:
+            if not self.frames and not self.closed:
+                self.cond.wait(timeout)
+            if not self.frames:
+                return None
+            return self.frames.popleft()
+
+    def get_latest(self, timeout=None):
+        """Return the newest frame, discarding (and counting) any older ones"""
+        with self.cond:
+            if not self.frames and not self.closed:
+                self.cond.wait(timeout)
+            if not self.frames:
+                return None
+            frame = self.frames.pop()
+            self.dropped += len(self.frames)
+            self.frames.clear()
+            return frame
+
+    def close(self):
+        """Wake up any waiting reader and refuse to block again"""
+        with self.cond:
+            self.closed = True
+            self.frames.clear()
+            self.cond.notify_all()
+
+    def stats(self):
+        """Counters for monitoring preview latency under load"""
+        with self.cond:
+            return {
+                "buffered": len(self.frames),
+                "capacity": self.frames.maxlen,
+                "frames_in": self.put_count,
+                "dropped": self.dropped,
+            }
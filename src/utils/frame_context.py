@@ -0,0 +1,75 @@
+import threading
+import cv2
+
+
+class FrameContext:
+    def __init__(self, frame):
+        """
+        One captured BGR frame plus every resized copy and colour conversion
+        derived from it. Each (width, colour space) is built at most once, the
+        first time a detector asks for it, and never upscaled past the source.
+        Smaller sizes are resized from the nearest larger one already built.
+        """
+        self.source = frame
+        self.lock = threading.Lock()
+        self.cache = {}  # {(width, 'bgr' | 'rgb' | 'gray'): image}
+        self.ring_ref = None  # RingFrame of the source, if it is in a shared-memory ring
+
+    @staticmethod
+    def of(frame):
+        """Wrap a plain image; pass an existing FrameContext through unchanged"""
+        return frame if isinstance(frame, FrameContext) else FrameContext(frame)
+
+    @property
+    def shape(self):
+        return self.source.shape
+
+    def _width(self, width):
+        # Requests at or above the source size all share the source itself
+        if width is None or width >= self.source.shape[1]:
+            return None
+        return int(width)
+
+    def _build_bgr(self, width):
+        larger = [w for (w, space) in self.cache if space == 'bgr' and w is not None and w > width]
+        base = self.cache[(min(larger), 'bgr')] if larger else self.source
+        h, w = base.shape[:2]
+        return cv2.resize(base, (width, int(round(h * width / float(w)))), interpolation=cv2.INTER_AREA)
+
+    def _get(self, width, space):
+        key = (self._width(width), space)
+        with self.lock:
+            image = self.cache.get(key)
+            if image is not None:
+                return image
+            if key == (None, 'bgr'):
+                return self.source
+            if space == 'bgr':
+                image = self._build_bgr(key[0])
+            else:
+                bgr = self.cache.get((key[0], 'bgr'))
+                if bgr is None:
+                    bgr = self.source if key[0] is None else self._build_bgr(key[0])
+                    if key[0] is not None:
+                        self.cache[(key[0], 'bgr')] = bgr
+                code = cv2.COLOR_BGR2RGB if space == 'rgb' else cv2.COLOR_BGR2GRAY
+                image = cv2.cvtColor(bgr, code)
+            image.flags.writeable = False  # Shared by every consumer of this frame
+            self.cache[key] = image
+            return image
+
+    def bgr(self, width=None):
+        return self._get(width, 'bgr')
+
+    def rgb(self, width=None):
+        return self._get(width, 'rgb')
+
+    def gray(self, width=None):
+        return self._get(width, 'gray')
+
+    def __getstate__(self):
+        # Only the source crosses process boundaries; derived images are rebuilt there
+        return {'source': self.source}
+
+    def __setstate__(self, state):
+        self.__init__(state['source'])
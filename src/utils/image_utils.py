@@ -72,4 +72,58 @@ def normalize_frame(frame):
     # Apply Gaussian blur to reduce noise
     blurred = cv2.GaussianBlur(gray, (5, 5), 0)
     
-    return blurred 
\ No newline at end of file
+    return blurred
+
+def frame_quality(gray):
+    """
+    Cheap quality measures of a small grayscale image: sharpness (variance of
+    the Laplacian), mean luminance and the share of clipped pixels
+    """
+    _, std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+    clipped = np.count_nonzero((gray <= 10) | (gray >= 245))
+    return {
+        'sharpness': float(std[0, 0] ** 2),
+        'brightness': float(gray.mean()),
+        'clipped_fraction': float(clipped) / gray.size,
+    }
+
+def quality_problem(quality, min_sharpness=20.0, min_brightness=40, max_brightness=215, max_clipped_fraction=0.35):
+    """
+    Name of the first failed check ('too_dark', 'overexposed', 'clipped', 'blurred'),
+    or None when the frame is good enough for face recognition
+    """
+    if quality['brightness'] < min_brightness:
+        return 'too_dark'
+    if quality['brightness'] > max_brightness:
+        return 'overexposed'
+    if quality['clipped_fraction'] > max_clipped_fraction:
+        return 'clipped'
+    if quality['sharpness'] < min_sharpness:
+        return 'blurred'
+    return None
+
+def jpeg_size(data):
+    """
+    (width, height) from a JPEG's frame header without decoding it, or None if
+    no frame header is found
+    """
+    i = 2
+    if data[:2] != b'\xff\xd8':
+        return None
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        length = (data[i + 2] << 8) | data[i + 3]
+        # SOF0..SOF15 carry the size; C4 (DHT), C8 (JPG) and CC (DAC) are not frames
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 9 > len(data):
+                return None
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + length
+    return None
@@ -0,0 +1,49 @@
+import os
+
+# smaps_rollup fields worth reporting, in kB
+_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb',
+}
+
+
+def process_memory(pid='self'):
+    """
+    RSS, PSS and shared/private breakdown (MB) of one process, from /proc.
+    PSS splits shared pages between the processes using them, so summing PSS
+    over the workers gives the real footprint of a pre-forked server.
+    """
+    report = {'pid': os.getpid() if pid == 'self' else pid}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                key = parts[0].rstrip(':')
+                if key in _FIELDS:
+                    report[_FIELDS[key]] = round(int(parts[1]) / 1024, 1)
+    except OSError:
+        # Older kernels: RSS only
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        report['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            return report
+    if 'shared_clean_mb' in report:
+        report['shared_mb'] = round(report['shared_clean_mb'] + report['shared_dirty_mb'], 1)
+    return report
+
+
+def workers_memory(pids):
+    """process_memory() for each pid, plus totals"""
+    workers = [process_memory(pid) for pid in pids]
+    return {
+        'workers': workers,
+        'total_rss_mb': round(sum(w.get('rss_mb', 0) for w in workers), 1),
+        'total_pss_mb': round(sum(w.get('pss_mb', 0) for w in workers), 1),
+    }
@@ -0,0 +1,131 @@
+import cv2
+import time
+from threading import Thread, Lock, Condition
+from src.utils.frame_channel import FrameChannel
+
+
+class _HubSession:
+    def __init__(self, channel_size):
+        self.channel = FrameChannel(maxlen=channel_size)
+        self.cond = Condition()
+        self.subscribers = 0
+        self.encoder = None
+        self.part = None
+        self.seq = 0
+        self.encoded = 0
+        self.encode_time = 0.0
+        self.closed = False
+
+
+class MJPEGHub:
+    def __init__(self, quality=80, max_fps=10, channel_size=2):
+        """
+        Encode-once MJPEG broadcaster.
+        Each session's processed frames are JPEG-encoded by a single encoder thread,
+        and the same bytes are fanned out to every connected viewer.
+        """
+        self.quality = quality
+        self.max_fps = max_fps
+        self.channel_size = channel_size
+        self.lock = Lock()
+        self.sessions = {}
+
+    def _session(self, session_id):
+        with self.lock:
+            sess = self.sessions.get(session_id)
+            if sess is None or sess.closed:
+                sess = _HubSession(self.channel_size)
+                self.sessions[session_id] = sess
+            return sess
+
+    def has_subscribers(self, session_id):
+        """True when at least one viewer is watching this session"""
+        sess = self.sessions.get(session_id)
+        return sess is not None and sess.subscribers > 0
+
+    def publish(self, session_id, frame):
+        """Hand a processed frame to the encoder; ignored when nobody is watching"""
+        sess = self.sessions.get(session_id)
+        if sess is None or sess.subscribers == 0:
+            return False
+        sess.channel.put(frame)
+        return True
+
+    def subscribe(self, session_id):
+        """Generator of multipart MJPEG parts for one viewer"""
+        sess = self._session(session_id)
+        with self.lock:
+            sess.subscribers += 1
+            if sess.encoder is None:
+                sess.encoder = Thread(target=self._encode_loop, args=(sess,))
+                sess.encoder.daemon = True
+                sess.encoder.start()
+        last_seq = 0
+        try:
+            while True:
+                with sess.cond:
+                    sess.cond.wait_for(lambda: sess.seq != last_seq or sess.closed, timeout=1.0)
+                    if sess.closed:
+                        return
+                    if sess.seq == last_seq:
+                        continue
+                    last_seq = sess.seq
+                    part = sess.part
+                yield part
+        finally:
+            with self.lock:
+                sess.subscribers -= 1
+
+    def _encode_loop(self, sess):
+        min_interval = 1.0 / self.max_fps if self.max_fps else 0
+        last_encode = 0
+        while True:
+            with self.lock:
+                if sess.subscribers == 0 or sess.closed:
+                    sess.encoder = None
+                    return
+            # Respect the fps cap; frames arriving meanwhile are collapsed to the newest
+            wait = last_encode + min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            frame = sess.channel.get_latest(timeout=0.5)
+            if frame is None:
+                continue
+            start = time.time()
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ret:
+                continue
+            part = (b'--frame\r\n'
+                    b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+            last_encode = time.time()
+            with sess.cond:
+                sess.part = part
+                sess.seq += 1
+                sess.encoded += 1
+                sess.encode_time += last_encode - start
+                sess.cond.notify_all()
+
+    def close(self, session_id):
+        """End a session's stream and disconnect its viewers"""
+        with self.lock:
+            sess = self.sessions.pop(session_id, None)
+        if sess is None:
+            return
+        sess.channel.close()
+        with sess.cond:
+            sess.closed = True
+            sess.cond.notify_all()
+
+    def stats(self):
+        """Per-session viewer and encoder counters"""
+        with self.lock:
+            sessions = list(self.sessions.items())
+        return {
+            session_id: {
+                "subscribers": sess.subscribers,
+                "frames_encoded": sess.encoded,
+                "avg_encode_ms": round(sess.encode_time / sess.encoded * 1000, 2) if sess.encoded else 0.0,
+                "channel": sess.channel.stats(),
+            }
+            for session_id, sess in sessions
+        }
@@ -0,0 +1,158 @@
+import glob
+import threading
+import os.path as osp
+
+
+class SharedFaceModels:
+    def __init__(self, models):
+        """
+        FaceAnalysis-compatible handle over models owned by the ModelRegistry.
+        Only read-only inference paths (get, det_model, models) are exposed, and
+        ONNX Runtime sessions can be run from several threads at once.
+        """
+        self.models = models
+        self.det_model = models.get('detection')
+
+    def get(self, img, max_num=0):
+        """Same as FaceAnalysis.get: detect, then run every other module per face"""
+        from insightface.app.common import Face
+        bboxes, kpss = self.det_model.detect(img, max_num=max_num, metric='default')
+        faces = []
+        for i in range(bboxes.shape[0]):
+            face = Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None,
+                        det_score=bboxes[i, 4])
+            for taskname, model in self.models.items():
+                if taskname != 'detection':
+                    model.get(img, face)
+            faces.append(face)
+        return faces
+
+
+class ModelRegistry:
+    def __init__(self, root='~/.insightface', providers=('CPUExecutionProvider',), session_threads=None):
+        """
+        Process-wide cache of InsightFace models (and the YOLO phone detector).
+        Recognition (and other non-detection) models are loaded once per model pack
+        and shared by every handle; detectors keep their input size and threshold on
+        the model, so one is kept per (pack, det_size, det_thresh).
+        session_threads caps ONNX Runtime's intra-op threads; with 1 no thread pool is
+        created, which keeps sessions usable in processes forked after loading.
+        """
+        self.root = root
+        self.providers = list(providers)
+        self.session_threads = session_threads
+        self.lock = threading.Lock()
+        self.tasks = {}  # {onnx file: taskname}, so files are only probed once
+        self.shared = {}  # {(pack, taskname): prepared model}
+        self.detectors = {}  # {(pack, det_size, det_thresh): prepared detector}
+        self.handles = {}  # {(model_name, det_size, modules, det_thresh, detector pack): SharedFaceModels}
+        self.yolo_models = {}  # {weights: YoloOnnxDetector, or ultralytics YOLO for .pt weights}
+
+    def _session_options(self):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if self.session_threads:
+            options.intra_op_num_threads = self.session_threads
+            options.inter_op_num_threads = self.session_threads
+        return options
+
+    def _load(self, pack, taskname):
+        # Imported here so importing the app does not pull in InsightFace/ONNX Runtime
+        import onnxruntime
+        from insightface.model_zoo.model_zoo import ModelRouter
+        from insightface.utils import ensure_available
+        onnxruntime.set_default_logger_severity(3)
+        options = self._session_options()
+        model_dir = ensure_available('models', pack, root=self.root)
+        for onnx_file in sorted(glob.glob(osp.join(model_dir, '*.onnx'))):
+            if self.tasks.get(onnx_file, taskname) != taskname:
+                continue
+            # Same routing as model_zoo.get_model, but with our session options
+            model = ModelRouter(onnx_file).get_model(sess_options=options, providers=self.providers)
+            if model is None:
+                continue
+            self.tasks[onnx_file] = model.taskname
+            if model.taskname == taskname:
+                return model
+        raise RuntimeError(f"No '{taskname}' model in InsightFace pack '{pack}'")
+
+    def _detector(self, pack, det_size, det_thresh):
+        key = (pack, det_size, det_thresh)
+        if key not in self.detectors:
+            model = self._load(pack, 'detection')
+            model.prepare(0, input_size=det_size, det_thresh=det_thresh)
+            self.detectors[key] = model
+        return self.detectors[key]
+
+    def _shared(self, pack, taskname):
+        key = (pack, taskname)
+        if key not in self.shared:
+            model = self._load(pack, taskname)
+            model.prepare(0)
+            self.shared[key] = model
+        return self.shared[key]
+
+    def face_models(self, model_name='buffalo_l', det_size=(320, 320), modules=('detection', 'recognition'),
+                    det_thresh=0.5, detector_model=None):
+        """
+        Return the shared handle for this configuration, loading only what is missing.
+        detector_model takes the detector from another pack; the other modules
+        always come from model_name.
+        """
+        det_size = tuple(det_size)
+        detector_pack = detector_model or model_name
+        key = (model_name, det_size, tuple(sorted(modules)), det_thresh, detector_pack)
+        with self.lock:
+            handle = self.handles.get(key)
+            if handle is None:
+                models = {}
+                for taskname in modules:
+                    if taskname == 'detection':
+                        models[taskname] = self._detector(detector_pack, det_size, det_thresh)
+                    else:
+                        models[taskname] = self._shared(model_name, taskname)
+                handle = SharedFaceModels(models)
+                self.handles[key] = handle
+            return handle
+
+    def yolo(self, weights='yolov8n.onnx'):
+        """
+        Shared YOLO detector: ONNX Runtime for .onnx files, ultralytics (torch) for
+        .pt weights. The ultralytics predictor is not thread-safe, so callers must
+        not run it from several threads at once (AsyncPhoneDetector doesn't).
+        """
+        with self.lock:
+            model = self.yolo_models.get(weights)
+            if model is None:
+                if weights.endswith('.onnx'):
+                    from src.monitoring.yolo_onnx import YoloOnnxDetector
+                    model = YoloOnnxDetector(weights, session_options=self._session_options(),
+                                             providers=self.providers)
+                else:
+                    from ultralytics import YOLO
+                    model = YOLO(weights)
+                self.yolo_models[weights] = model
+            return model
+
+    def stats(self):
+        with self.lock:
+            return {
+                'handles': len(self.handles),
+                'yolo': sorted(self.yolo_models),
+                'shared_models': sorted('/'.join(key) for key in self.shared),
+                'detectors': sorted(f"{pack}@{size[0]}x{size[1]}" for pack, size, _ in self.detectors),
+            }
+
+
+registry = ModelRegistry()
+
+
+def get_face_models(model_name='buffalo_l', det_size=(320, 320), modules=('detection', 'recognition'),
+                    det_thresh=0.5, detector_model=None):
+    """Shared InsightFace handle from the process-wide registry"""
+    return registry.face_models(model_name, det_size, modules, det_thresh, detector_model)
+
+
+def get_yolo(weights='yolov8n.onnx'):
+    """Shared YOLO model from the process-wide registry"""
+    return registry.yolo(weights)
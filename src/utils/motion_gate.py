@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+from src.utils.frame_context import FrameContext
+
+
+class MotionGate:
+    def __init__(self, size=(64, 48), learning_rate=0.05, pixel_threshold=15,
+                 changed_fraction=0.02, keep_alive=10.0):
+        """
+        Cheap scene-change detector for one session. Frames are shrunk to a small
+        grayscale image and compared with a running-average background; a frame
+        counts as changed when more than `changed_fraction` of its pixels differ by
+        more than `pixel_threshold` grey levels. Slow lighting drift is absorbed by
+        the background. Heavy analysis is allowed after any change since the last
+        analysis, and at least every `keep_alive` seconds regardless.
+        """
+        self.size = size
+        self.learning_rate = learning_rate
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.keep_alive = keep_alive
+        self.background = None
+        self.changed = True  # Nothing analysed yet
+        self.last_analyzed = 0.0
+        self.last_score = 0.0
+        self.frames = 0
+        self.gated = 0
+        self.analyzed = 0
+
+    def update(self, frame):
+        """Feed every frame (BGR image or FrameContext); returns the fraction of pixels that changed"""
+        small = FrameContext.of(frame).gray(self.size[0])
+        if small.shape[:2] != (self.size[1], self.size[0]):
+            small = cv2.resize(small, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(small, (5, 5), 0).astype(np.float32)
+        self.frames += 1
+        if self.background is None:
+            self.background = gray
+            return 1.0
+        diff = cv2.absdiff(gray, self.background)
+        self.last_score = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        if self.last_score > self.changed_fraction:
+            self.changed = True
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        return self.last_score
+
+    def should_analyze(self, now):
+        """Call when a heavy check is due; False means the previous results still hold"""
+        if self.changed or now - self.last_analyzed >= self.keep_alive:
+            self.changed = False
+            self.last_analyzed = now
+            self.analyzed += 1
+            return True
+        self.gated += 1
+        return False
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'checks_run': self.analyzed,
+            'checks_gated': self.gated,
+            'last_change': round(self.last_score, 4),
+        }
@@ -0,0 +1,135 @@
+import time
+import numpy as np
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+# Reference to one frame in a ring, small enough to send instead of the pixels
+RingFrame = namedtuple('RingFrame', ['name', 'seq'])
+
+# Header layout (int64): magic, slot count, height, width, channels, latest sequence number
+_MAGIC = 0x46524D52494E47  # "FRMRING"
+_HEADER_FIELDS = 6
+_LATEST = 5
+
+
+class SharedFrameRing:
+    def __init__(self, name=None, slots=4, shape=(480, 640, 3), create=True):
+        """
+        Fixed-size ring of frames in multiprocessing shared memory.
+        One writer (the capture thread) and any number of reader processes.
+        Every slot carries a seqlock counter: odd while the slot is being written,
+        2 * frame sequence number once the frame is complete.
+        """
+        if create:
+            height, width, channels = shape
+            frame_bytes = height * width * channels
+            size = (_HEADER_FIELDS + slots) * 8 + slots * frame_bytes
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = (_MAGIC, slots, height, width, channels, 0)
+        else:
+            self.shm = _attach_untracked(name)
+            self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            if self.header[0] != _MAGIC:
+                self.shm.close()
+                raise ValueError(f"Shared memory block {name!r} is not a frame ring")
+            slots = int(self.header[1])
+            shape = tuple(int(v) for v in self.header[2:5])
+        self.owner = create
+        self.name = self.shm.name
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf,
+                                   offset=_HEADER_FIELDS * 8)
+        self.data = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                               offset=(_HEADER_FIELDS + slots) * 8)
+
+    @classmethod
+    def attach(cls, name):
+        """Map an existing ring created by another process"""
+        return cls(name=name, create=False)
+
+    @property
+    def latest_seq(self):
+        return int(self.header[_LATEST])
+
+    def write(self, frame):
+        """Copy a frame into the next slot (single writer only)"""
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.shape}")
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        self.slot_seq[slot] = 2 * seq - 1  # odd: write in progress
+        self.data[slot][...] = frame
+        self.slot_seq[slot] = 2 * seq
+        self.header[_LATEST] = seq
+        return seq
+
+    def view(self, seq):
+        """
+        Zero-copy read-only view of frame seq, or None if it was already overwritten.
+        The view stays valid only while is_valid(seq) holds; check again after use.
+        """
+        if seq <= 0 or seq <= self.latest_seq - self.slots:
+            return None
+        slot = seq % self.slots
+        if self.slot_seq[slot] != 2 * seq:
+            return None
+        frame = self.data[slot]
+        frame.flags.writeable = False
+        return frame
+
+    def is_valid(self, seq):
+        """True if the slot holding seq has not been rewritten since it was read"""
+        return seq > 0 and self.slot_seq[seq % self.slots] == 2 * seq
+
+    def read_latest(self, copy=True):
+        """
+        Return (seq, frame) for the newest complete frame, or (0, None) if none yet.
+        With copy=False the frame is a view; confirm it with is_valid(seq) after use.
+        """
+        for _ in range(self.slots):
+            seq = self.latest_seq
+            if seq == 0:
+                return 0, None
+            frame = self.view(seq)
+            if frame is None:
+                continue
+            if copy:
+                frame = frame.copy()
+                if not self.is_valid(seq):
+                    continue  # Torn read: the writer lapped us mid-copy
+            return seq, frame
+        return 0, None
+
+    def wait_for_frame(self, after_seq=0, timeout=None, poll_interval=0.002):
+        """Poll until a frame newer than after_seq is available; see read_latest()"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.latest_seq <= after_seq:
+            if deadline is not None and time.time() >= deadline:
+                return after_seq, None
+            time.sleep(poll_interval)
+        return self.read_latest(copy=False)
+
+    def close(self):
+        """Unmap the ring; the creating process also removes the block"""
+        self.header = self.slot_seq = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach_untracked(name):
+    # Readers must not register the block with their resource tracker, or it
+    # would be unlinked when the first reader process exits.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track flag; skip registration while attaching
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
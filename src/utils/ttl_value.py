@@ -0,0 +1,27 @@
+import time
+import threading
+
+
+class TTLValue:
+    def __init__(self, loader, ttl=5.0):
+        """
+        Result of loader() (e.g. a settings table), re-read at most every `ttl`
+        seconds. Settings written by another web worker process show up here
+        within ttl; call invalidate() after writing to see the change at once.
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.value = None
+        self.loaded_at = None
+
+    def get(self):
+        with self.lock:
+            if self.loaded_at is None or time.time() - self.loaded_at >= self.ttl:
+                self.value = self.loader()
+                self.loaded_at = time.time()
+            return self.value
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
@@ -0,0 +1,105 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+
+class _Component:
+    def __init__(self, loader, warm, required):
+        self.loader = loader
+        self.warm = warm
+        self.required = required
+        self.state = 'pending'
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.warm_seconds = None
+        self.done = threading.Event()
+
+
+class ModelWarmup:
+    def __init__(self):
+        """
+        Builds heavy models on a background thread, in the order they were added,
+        and runs one dummy inference on each so the first real request does not pay
+        for lazy initialisation. Callers fetch a model with get(), which can wait.
+        """
+        self.lock = threading.Lock()
+        self.components = OrderedDict()
+        self.thread = None
+
+    def add(self, name, loader, warm=None, required=True):
+        """
+        Register loader() to build `name`, then warm(model) to exercise it once.
+        Optional components do not hold back readiness if they fail.
+        """
+        self.components[name] = _Component(loader, warm, required)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="model-warmup")
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def _run(self):
+        for name, component in self.components.items():
+            with self.lock:
+                component.state = 'loading'
+            started = time.time()
+            try:
+                value = component.loader()
+                loaded = time.time()
+                if component.warm is not None:
+                    component.warm(value)
+                finished = time.time()
+            except Exception as e:
+                logging.error(f"Warm-up of {name} failed: {e}")
+                with self.lock:
+                    component.state = 'failed'
+                    component.error = str(e)
+                component.done.set()
+                continue
+            with self.lock:
+                component.value = value
+                component.state = 'ready'
+                component.load_seconds = round(loaded - started, 2)
+                component.warm_seconds = round(finished - loaded, 2)
+            component.done.set()
+            logging.info(f"{name} ready in {finished - started:.1f}s")
+
+    def get(self, name, timeout=None):
+        """
+        The model once it is ready. Waits up to `timeout` seconds (forever if None,
+        not at all if 0); returns None if it is still loading or failed to load.
+        """
+        component = self.components[name]
+        if timeout != 0:
+            component.done.wait(timeout)
+        return component.value
+
+    def require(self, name):
+        """For loaders that build on an earlier component: its model, or an error if it failed"""
+        component = self.components[name]
+        component.done.wait()
+        if component.value is None:
+            raise RuntimeError(f"{name} is unavailable: {component.error}")
+        return component.value
+
+    def is_ready(self):
+        with self.lock:
+            return all(c.state == 'ready' or (not c.required and c.state == 'failed')
+                       for c in self.components.values())
+
+    def status(self):
+        with self.lock:
+            return {
+                name: {
+                    'state': c.state,
+                    'required': c.required,
+                    'load_seconds': c.load_seconds,
+                    'warm_seconds': c.warm_seconds,
+                    'error': c.error,
+                }
+                for name, c in self.components.items()
+            }
@@ -0,0 +1,66 @@
+// Streams the student's own webcam to the server for proctoring.
+// The server negotiates resolution, fps and JPEG quality; frames are posted one per request.
+(function() {
+    const video = document.createElement('video');
+    video.muted = true;
+    video.playsInline = true;
+    const canvas = document.createElement('canvas');
+    let settings = null;
+    let inFlight = false;
+
+    async function negotiate() {
+        const res = await fetch('/ingest/negotiate', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({width: 320, height: 240, fps: 10})
+        });
+        if (!res.ok) {
+            throw new Error('Frame ingestion not available (' + res.status + ')');
+        }
+        return res.json();
+    }
+
+    function sendFrame() {
+        // Skip this tick rather than queueing uploads behind a slow connection
+        if (inFlight || video.readyState < 2) {
+            return;
+        }
+        canvas.getContext('2d').drawImage(video, 0, 0, canvas.width, canvas.height);
+        canvas.toBlob(function(blob) {
+            if (!blob) {
+                return;
+            }
+            inFlight = true;
+            fetch(settings.endpoint, {
+                method: 'POST',
+                headers: {'Content-Type': 'image/jpeg'},
+                body: blob
+            }).catch(function() {}).finally(function() {
+                inFlight = false;
+            });
+        }, 'image/jpeg', settings.jpeg_quality);
+    }
+
+    async function start() {
+        try {
+            settings = await negotiate();
+            const stream = await navigator.mediaDevices.getUserMedia({
+                video: {
+                    width: {ideal: settings.width},
+                    height: {ideal: settings.height},
+                    frameRate: {ideal: settings.fps}
+                },
+                audio: false
+            });
+            video.srcObject = stream;
+            await video.play();
+            canvas.width = settings.width;
+            canvas.height = settings.height;
+            setInterval(sendFrame, 1000 / settings.fps);
+        } catch (err) {
+            console.error('Proctoring camera error:', err);
+        }
+    }
+
+    window.addEventListener('DOMContentLoaded', start);
+})();